@@ -1,52 +1,152 @@
 import warnings
-from flask import Flask
+from flask import Flask, jsonify
 from app.config import Config, HAILO_MODEL_PATH
-from app.services.capture_service import CaptureService
-from app.services.detection_service import DetectionService
-from app.services.logger_service import Logger
 
 warnings.filterwarnings("ignore", category=RuntimeWarning)
 
 capture_service = None
+capture_services = {}
 detection_service = None
 logger = None
 
 
 def create_app(config_class=Config):
-    global capture_service, detection_service, logger
+    global capture_service, capture_services, detection_service, logger
+    # Services (and with them cv2 and numpy) load here rather than on "import app",
+    # so tools that only read app.config start fast
+    from app.services.capture_service import CaptureService, UnknownSourceError
+    from app.services.detection_service import DetectionService
+    from app.services.frame_bus import FrameBus
+    from app.services.logger_service import Logger
+    from app.services.result_cache import ResultCache, DiskCacheBackend
+    from app.utils.camera import create_source
     
     app = Flask(__name__)
     app.config.from_object(config_class)
     
     logger = Logger()
     
+    result_cache = None
+    if app.config['RESULT_CACHE_SIZE'] > 0:
+        backend = None
+        if app.config['RESULT_CACHE_DIR']:
+            backend = DiskCacheBackend(app.config['RESULT_CACHE_DIR'], max_entries=app.config['RESULT_CACHE_SIZE'])
+        result_cache = ResultCache(app.config['RESULT_CACHE_SIZE'], app.config['RESULT_CACHE_TTL'], backend)
+    
     # Initialize detection service based on config
     detection_service = DetectionService(
             simulation_mode=app.config['SIMULATION_MODE'],
-            model_name=app.config['DEFAULT_MODEL']
+            model_name=app.config['DEFAULT_MODEL'],
+            max_batch_size=app.config['INFERENCE_MAX_BATCH'],
+            max_wait_ms=app.config['INFERENCE_MAX_WAIT_MS'],
+            queue_depth=app.config['INFERENCE_QUEUE_DEPTH'],
+            model_pool_size=app.config['MODEL_POOL_SIZE'],
+            result_cache=result_cache
         )
+    for model_name in app.config['PRELOAD_MODELS']:
+        detection_service.preload_model(model_name)
+    
+    # One capture pipeline per source, all sharing the detection service (and its model)
+    if app.config['FRAME_BUS_ROLE'] == 'reader':
+        capture_services = _shared_capture_services(app.config)
+    else:
+        capture_services = {
+            source_id: CaptureService(
+                simulation_mode=app.config['SIMULATION_MODE'],
+                detection_service=detection_service,
+                logger=logger,
+                target_fps=source_config.get('target_fps', app.config['CAPTURE_TARGET_FPS']),
+                source_id=source_id,
+                camera=create_source(source_config, simulation_mode=app.config['SIMULATION_MODE']),
+                preview_scale=app.config['PREVIEW_SCALE'],
+                max_variants=app.config['ENCODED_VARIANT_CACHE_SIZE'],
+                frame_pool_size=app.config['FRAME_POOL_SIZE'],
+                tracker=_create_tracker(app.config),
+                inference_interval=app.config['TRACKER_INFERENCE_INTERVAL'],
+                change_gate=_create_change_gate(app.config),
+                roi=source_config.get('roi'),
+                tile_size=source_config.get('tile_size'),
+                tile_overlap=source_config.get('tile_overlap', 0.2)
+            )
+            for source_id, source_config in app.config['CAPTURE_SOURCES'].items()
+        }
+        if app.config['FRAME_BUS_ROLE'] == 'writer':
+            for source_id, service in capture_services.items():
+                service.frame_bus = FrameBus.create(
+                    f"{app.config['FRAME_BUS_NAME']}-{source_id}",
+                    stream_id=int(service.stream_id, 16),
+                    slots=app.config['FRAME_BUS_SLOTS'],
+                    frame_bytes=app.config['FRAME_BUS_MAX_FRAME_BYTES'],
+                    max_detections=app.config['FRAME_BUS_MAX_DETECTIONS']
+                )
+    capture_service = capture_services[app.config['DEFAULT_SOURCE']]
     
-    capture_service = CaptureService(
-        simulation_mode=app.config['SIMULATION_MODE'],
-        detection_service=detection_service,
-        logger=logger
-    )
+    @app.errorhandler(UnknownSourceError)
+    def unknown_source(e):
+        return jsonify({"error": f"Unknown source: {e.args[0]}. Available: {list(capture_services.keys())}"}), 404
     
     from app.blueprints.main import bp as main_bp
     from app.blueprints.detection import bp as detection_bp
     from app.blueprints.logs import bp as logs_bp
     from app.blueprints.capture import bp as capture_bp
+    from app.blueprints.metrics import bp as metrics_bp
     
     app.register_blueprint(main_bp)
     app.register_blueprint(detection_bp)
     app.register_blueprint(logs_bp)
     app.register_blueprint(capture_bp)
+    app.register_blueprint(metrics_bp)
     
     return app
 
 
-def get_capture_service():
-    return capture_service
+def _create_tracker(config):
+    from app.services.tracker import IouTracker
+    
+    if not config['TRACKER_ENABLED']:
+        return None
+    return IouTracker(iou_threshold=config['TRACKER_IOU'], max_missed=config['TRACKER_MAX_MISSED'])
+
+
+def _create_change_gate(config):
+    from app.services.change_gate import ChangeGate
+    
+    if not config['CHANGE_GATE_ENABLED']:
+        return None
+    return ChangeGate(threshold=config['CHANGE_GATE_THRESHOLD'], refresh_seconds=config['CHANGE_GATE_REFRESH_SECONDS'])
+
+
+def _shared_capture_services(config):
+    """Follow the frame buses published by capture_process.py instead of opening cameras."""
+    from app.services.shared_capture_service import SharedCaptureService
+    
+    services = {}
+    for source_id in config['CAPTURE_SOURCES']:
+        services[source_id] = SharedCaptureService(
+            detection_service=detection_service,
+            logger=logger,
+            bus_name=f"{config['FRAME_BUS_NAME']}-{source_id}",
+            source_id=source_id,
+            preview_scale=config['PREVIEW_SCALE'],
+            max_variants=config['ENCODED_VARIANT_CACHE_SIZE']
+        )
+        services[source_id].start_capture()
+    return services
+
+
+def get_capture_service(source=None):
+    """Return the capture service for a source id, or the default source when None."""
+    from app.services.capture_service import UnknownSourceError
+    
+    if source is None:
+        return capture_service
+    if source not in capture_services:
+        raise UnknownSourceError(source)
+    return capture_services[source]
+
+
+def get_capture_services():
+    return capture_services
 
 
 def get_detection_service():
@@ -58,18 +158,19 @@ def get_logger():
 
 
 def set_detection_service(service_type, **kwargs):
-    """Switch detection service at runtime"""
-    global detection_service
+    """Switch detection service at runtime.
+
+    The existing service is updated in place so capture threads, which hold a
+    reference to it, pick up the new model on their next inference.
+    """
     if service_type.lower() == 'yolo':
         from app.config import YOLO_MODEL_PATHS
         model_name = kwargs.get('model', 'yolo11n')
         simulation_mode = kwargs.get('simulation_mode', False)
         if model_name not in YOLO_MODEL_PATHS:
             raise ValueError(f"Model '{model_name}' not found. Available: {list(YOLO_MODEL_PATHS.keys())}")
-        detection_service = DetectionService(
-            simulation_mode=simulation_mode,
-            model_name=model_name
-        )
+        detection_service.simulation_mode = simulation_mode
+        detection_service.change_model(model_name)
         return {"status": f"Switched to YOLO ({model_name})", "service": "yolo", "model": model_name}
     else:
-        raise ValueError(f"Unknown service type: {service_type}. Use 'yolo'")
\ No newline at end of file
+        raise ValueError(f"Unknown service type: {service_type}. Use 'yolo'")
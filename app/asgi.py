@@ -0,0 +1,462 @@
+import asyncio
+import contextvars
+import io
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import parse_qsl
+from app import create_app, get_capture_service, get_capture_services, get_logger
+from app.config import Config
+from app.services import metrics
+from app.services.capture_service import UnknownSourceError
+from app.utils.sse import keepalive
+from app.utils.streams import (
+    DetectionFeed, LogFeed, MjpegFeed, frame_body, frame_kind, latest_detections, parse_frame_options
+)
+
+
+class BusyError(Exception):
+    """Raised when the executor already has max_pending jobs queued."""
+
+
+class AsyncSignal:
+    """Wakes asyncio waiters when a capture service or logger publishes from another thread."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.waiters = set()
+
+    def notify(self, *args):
+        # Called from capture/logging threads, which must keep running after the loop shuts down
+        try:
+            self.loop.call_soon_threadsafe(self._wake)
+        except RuntimeError:
+            pass
+
+    def _wake(self):
+        for waiter in self.waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self.waiters.clear()
+
+    async def wait_for(self, predicate, timeout):
+        """Wait until predicate() is true. Returns False on timeout."""
+        deadline = self.loop.time() + timeout
+        while True:
+            # Register before checking so a publish in between is not missed
+            waiter = self.loop.create_future()
+            self.waiters.add(waiter)
+            if predicate():
+                self.waiters.discard(waiter)
+                return True
+            remaining = deadline - self.loop.time()
+            if remaining <= 0:
+                self.waiters.discard(waiter)
+                return False
+            try:
+                await asyncio.wait_for(waiter, remaining)
+            except asyncio.TimeoutError:
+                self.waiters.discard(waiter)
+                return predicate()
+
+
+class AsgiApp:
+    """ASGI front end for the Flask app.
+
+    Streams (MJPEG, detection and log events) and the frame and detection
+    endpoints are served by coroutines that wait on AsyncSignals instead of
+    threads, so open connections cost no threads at all. Blocking work
+    (encoding, inference and every other route, which falls through to the
+    Flask app) runs on a bounded executor: beyond max_pending queued jobs
+    requests get 503, and jobs slower than request_timeout get 504.
+    """
+
+    def __init__(self, flask_app, workers=8, max_pending=64, request_timeout=30.0, max_body_size=None):
+        self.flask_app = flask_app
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="asgi-worker")
+        self.max_pending = max_pending
+        self.request_timeout = request_timeout
+        self.max_body_size = max_body_size
+        self.pending = 0
+        self.pending_lock = threading.Lock()
+        self.loop = None
+        self.frame_signals = {}
+        self.log_signal = None
+        self.routes = {
+            '/frame': self.frame,
+            '/unprocessed_frame': self.unprocessed_frame,
+            '/stream': self.stream,
+            '/unprocessed_stream': self.unprocessed_stream,
+            '/detections': self.detections,
+            '/detections/stream': self.detection_events,
+            '/logs/stream': self.log_events,
+        }
+        # Native routes are timed under the same endpoint names the Flask hooks use
+        self.endpoints = {rule.rule: rule.endpoint for rule in flask_app.url_map.iter_rules()}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            return
+        self._bind()
+
+        handler = self.routes.get(scope['path']) if scope['method'] == 'GET' else None
+        if handler is None:
+            return await self.wsgi(scope, receive, send)
+        send = self._timed(send, self.endpoints.get(scope['path'], scope['path']))
+        try:
+            await handler(scope, receive, send, dict(parse_qsl(scope['query_string'].decode('latin-1'))))
+        except UnknownSourceError as e:
+            sources = list(get_capture_services().keys())
+            await self.send_json(send, {"error": f"Unknown source: {e.args[0]}. Available: {sources}"}, 404)
+        except ValueError as e:
+            await self.send_json(send, {"error": str(e)}, 400)
+        except BusyError:
+            await self.send_json(send, {"error": "Server busy"}, 503, [(b'retry-after', b'1')])
+        except asyncio.TimeoutError:
+            await self.send_json(send, {"error": "Request timed out"}, 504)
+
+    def _timed(self, send, endpoint):
+        """Wrap send to record the time to the response start, labelled like the Flask routes."""
+        started = time.perf_counter()
+
+        async def timed_send(message):
+            if message['type'] == 'http.response.start':
+                metrics.REQUEST_SECONDS.labels(endpoint, 'GET', message['status']).observe(time.perf_counter() - started)
+            await send(message)
+        return timed_send
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self._bind()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _bind(self):
+        """Hook the capture services and logger to this event loop on first use."""
+        if self.loop is not None:
+            return
+        self.loop = asyncio.get_running_loop()
+        for source_id, capture_service in get_capture_services().items():
+            signal = self.frame_signals[source_id] = AsyncSignal(self.loop)
+            capture_service.add_listener(signal.notify)
+        self.log_signal = AsyncSignal(self.loop)
+        get_logger().add_listener(self.log_signal.notify)
+
+    async def run(self, fn, *args, admit=True):
+        """Run fn in the executor with the request timeout. Raises BusyError when saturated.
+
+        A job counts as pending until its worker thread is done with it, so
+        requests that time out keep holding their slot and the queue behind
+        the executor cannot grow past max_pending.
+        """
+        with self.pending_lock:
+            if admit and self.pending >= self.max_pending:
+                raise BusyError()
+            self.pending += 1
+        try:
+            future = self.executor.submit(fn, *args)
+        except RuntimeError:
+            self._job_done(None)
+            raise
+        future.add_done_callback(self._job_done)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.request_timeout)
+        except asyncio.TimeoutError:
+            # Drops the job if no worker has picked it up yet
+            future.cancel()
+            raise
+
+    def _job_done(self, future):
+        # Runs on the worker thread that finished (or cancelled) the job
+        with self.pending_lock:
+            self.pending -= 1
+
+    # Frames
+
+    async def frame(self, scope, receive, send, args):
+        await self._frame(scope, send, args, frame_kind(args))
+
+    async def unprocessed_frame(self, scope, receive, send, args):
+        await self._frame(scope, send, args, "raw")
+
+    async def _frame(self, scope, send, args, kind):
+        capture_service = get_capture_service(args.get('source'))
+        options = parse_frame_options(args, self.flask_app.config['MAX_FRAME_DIMENSION'])
+
+        encoded = await self.run(partial(capture_service.get_encoded_frame, kind, **options))
+        data, mimetype, etag = frame_body(kind, capture_service, encoded, options)
+        if data is None:
+            return await self.send_body(send, b'', b'text/plain', 500)
+        if etag is None:
+            return await self.send_body(send, data, mimetype.encode())
+
+        etag = f'"{etag}"'.encode()
+        headers = [(b'etag', etag), (b'cache-control', b'no-cache')]
+        if etag in _if_none_match(scope):
+            return await self.send_body(send, b'', None, 304, headers)
+        await self.send_body(send, data, mimetype.encode(), 200, headers)
+
+    async def stream(self, scope, receive, send, args):
+        await self._stream(receive, send, args, frame_kind(args))
+
+    async def unprocessed_stream(self, scope, receive, send, args):
+        await self._stream(receive, send, args, "raw")
+
+    async def _stream(self, receive, send, args, kind, keepalive_interval=5.0):
+        capture_service = get_capture_service(args.get('source'))
+        signal = self.frame_signals[capture_service.source_id]
+        feed = MjpegFeed(capture_service, kind, parse_frame_options(args, self.flask_app.config['MAX_FRAME_DIMENSION']))
+
+        async def parts():
+            feed.update(await self._encoded_or_none(feed))
+            while True:
+                part = feed.part()
+                if part is not None:
+                    yield part
+                if await signal.wait_for(feed.has_new_frame, keepalive_interval):
+                    feed.update(await self._encoded_or_none(feed))
+
+        await self.send_stream(receive, send, parts(), b'multipart/x-mixed-replace; boundary=frame')
+
+    async def _encoded_or_none(self, feed):
+        # A saturated executor skips a stream frame instead of ending the stream
+        try:
+            return await self.run(feed.encode)
+        except (BusyError, asyncio.TimeoutError):
+            return None
+
+    # Detections
+
+    async def detections(self, scope, receive, send, args):
+        capture_service = get_capture_service(args.get('source'))
+        body, headers = latest_detections(capture_service, args.get('format', 'json').lower())
+        headers = [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+        if isinstance(body, bytes):
+            return await self.send_body(send, body, b'application/octet-stream', 200, headers)
+        await self.send_json(send, body, 200, headers)
+
+    async def detection_events(self, scope, receive, send, args, keepalive_interval=15.0):
+        capture_service = get_capture_service(args.get('source'))
+        signal = self.frame_signals[capture_service.source_id]
+        feed = DetectionFeed(capture_service, _last_event_id(scope, args))
+
+        async def events():
+            while True:
+                event = feed.next_event()
+                if event is not None:
+                    yield event
+                if not await signal.wait_for(feed.has_new_frame, keepalive_interval):
+                    yield keepalive()
+
+        await self.send_stream(receive, send, events(), b'text/event-stream')
+
+    # Logs
+
+    async def log_events(self, scope, receive, send, args, keepalive_interval=15.0):
+        feed = LogFeed(get_logger(), _last_event_id(scope, args))
+
+        async def events():
+            while True:
+                for event in feed.next_events():
+                    yield event
+                if not await self.log_signal.wait_for(feed.has_new_logs, keepalive_interval):
+                    yield keepalive()
+
+        await self.send_stream(receive, send, events(), b'text/event-stream')
+
+    # Responses
+
+    async def send_body(self, send, body, content_type, status=200, headers=()):
+        headers = list(headers) + [(b'content-length', str(len(body)).encode())]
+        if content_type is not None:
+            headers.append((b'content-type', content_type))
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def send_json(self, send, data, status=200, headers=()):
+        await self.send_body(send, json.dumps(data).encode(), b'application/json', status, headers)
+
+    async def send_stream(self, receive, send, chunks, content_type):
+        """Send chunks until the generator ends or the client disconnects."""
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', content_type),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ]})
+
+        async def pump():
+            async for chunk in chunks:
+                await send({'type': 'http.response.body', 'body': _to_bytes(chunk), 'more_body': True})
+
+        pumping = asyncio.ensure_future(pump())
+        disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+        try:
+            done, _ = await asyncio.wait([pumping, disconnected], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (pumping, disconnected):
+                task.cancel()
+            await asyncio.gather(pumping, disconnected, return_exceptions=True)
+            await chunks.aclose()
+        if pumping in done and not pumping.cancelled() and pumping.exception() is None:
+            await send({'type': 'http.response.body', 'body': b''})
+
+    # Everything else goes to the Flask app
+
+    async def wsgi(self, scope, receive, send):
+        """Serve a request through the Flask app on the executor.
+
+        The body is received here first, so slow uploads hold no thread. Each
+        response chunk is fetched on the executor, so streamed Flask responses
+        (e.g. /detect/batch) are forwarded as they are produced.
+        """
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body += message.get('body', b'')
+            if self.max_body_size is not None and len(body) > self.max_body_size:
+                return await self.send_json(send, {"error": "Request body too large"}, 413)
+            if not message.get('more_body', False):
+                break
+
+        environ = _wsgi_environ(scope, bytes(body))
+        try:
+            response, first = await self.run(self._start_wsgi, environ)
+        except BusyError:
+            return await self.send_json(send, {"error": "Server busy"}, 503, [(b'retry-after', b'1')])
+        except asyncio.TimeoutError:
+            return await self.send_json(send, {"error": "Request timed out"}, 504)
+
+        try:
+            await send({'type': 'http.response.start', 'status': response.status, 'headers': response.headers})
+            chunk = first
+            while chunk is not None:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = await self.run(response.next, admit=False)
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            self.loop.run_in_executor(self.executor, response.close)
+
+    def _start_wsgi(self, environ):
+        response = _WsgiResponse(self.flask_app, environ)
+        return response, response.next()
+
+
+class _WsgiResponse:
+    """A WSGI response whose chunks may each be produced on a different executor thread.
+
+    Flask pushes its contexts on one step and pops them on a later one (for
+    stream_with_context, at the end of the stream), which only works when every
+    step runs in the same contextvars context. The lock keeps close from
+    entering that context while a chunk is still being produced.
+    """
+
+    def __init__(self, app, environ):
+        self.status = None
+        self.headers = None
+        self.context = contextvars.copy_context()
+        self.lock = threading.Lock()
+        self.app_iter = self._step(app, environ, self._start_response)
+        self.iterator = self._step(iter, self.app_iter)
+
+    def _start_response(self, status, headers, exc_info=None):
+        self.status = int(status.split(' ', 1)[0])
+        self.headers = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+    def _step(self, fn, *args):
+        with self.lock:
+            return self.context.run(fn, *args)
+
+    def next(self):
+        return self._step(next, self.iterator, None)
+
+    def close(self):
+        if hasattr(self.app_iter, 'close'):
+            self._step(self.app_iter.close)
+
+
+def _to_bytes(chunk):
+    return chunk.encode() if isinstance(chunk, str) else chunk
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+def _header(scope, name):
+    for key, value in scope['headers']:
+        if key == name:
+            return value
+    return None
+
+
+def _if_none_match(scope):
+    value = _header(scope, b'if-none-match')
+    if value is None:
+        return set()
+    return {tag.strip().removeprefix(b'W/') for tag in value.split(b',')}
+
+
+def _last_event_id(scope, args, default=0):
+    """Resume cursor from ?since= or the Last-Event-ID header, like utils.sse.last_event_id."""
+    value = args.get('since', _header(scope, b'last-event-id'))
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _wsgi_environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'CONTENT_LENGTH':
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def create_asgi_app(config_class=Config):
+    """Build the Flask app and wrap it for an ASGI server such as uvicorn."""
+    flask_app = create_app(config_class)
+    return AsgiApp(
+        flask_app,
+        workers=flask_app.config['ASGI_WORKERS'],
+        max_pending=flask_app.config['ASGI_MAX_PENDING'],
+        request_timeout=flask_app.config['ASGI_REQUEST_TIMEOUT'],
+        max_body_size=flask_app.config['ASGI_MAX_BODY_SIZE']
+    )
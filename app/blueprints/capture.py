@@ -1,29 +1,72 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 
 bp = Blueprint('capture', __name__)
 
 
+def _requested_services():
+    """Capture services named by ?source= or a JSON "source" field; "all" selects every source."""
+    from app import get_capture_service, get_capture_services
+    
+    source = request.args.get('source')
+    if source is None and request.is_json:
+        source = (request.get_json(silent=True) or {}).get('source')
+    if source == 'all':
+        return list(get_capture_services().values())
+    return [get_capture_service(source)]
+
+
 @bp.route('/start_capture', methods=['POST'])
 def start_capture():
-    from app import get_capture_service, get_logger
+    from app import get_logger
     from app.services.logger_service import LogLevel
     
-    capture_service = get_capture_service()
     logger = get_logger()
     
-    capture_service.start_capture()
-    logger.log(LogLevel.INFO, "Capture started via API", "start_capture_endpoint")
-    return jsonify({"status": "Capture started"})
+    sources = []
+    for capture_service in _requested_services():
+        capture_service.start_capture()
+        sources.append(capture_service.source_id)
+    logger.log(LogLevel.INFO, f"Capture started via API ({', '.join(sources)})", "start_capture_endpoint")
+    return jsonify({"status": "Capture started", "sources": sources})
 
 
 @bp.route('/stop_capture', methods=['POST'])
 def stop_capture():
-    from app import get_capture_service, get_logger
+    from app import get_logger
     from app.services.logger_service import LogLevel
     
-    capture_service = get_capture_service()
     logger = get_logger()
     
-    capture_service.stop_capture()
-    logger.log(LogLevel.INFO, "Capture stopped via API", "stop_capture_endpoint")
-    return jsonify({"status": "Capture stopped"})
+    sources = []
+    for capture_service in _requested_services():
+        capture_service.stop_capture()
+        sources.append(capture_service.source_id)
+    logger.log(LogLevel.INFO, f"Capture stopped via API ({', '.join(sources)})", "stop_capture_endpoint")
+    return jsonify({"status": "Capture stopped", "sources": sources})
+
+
+@bp.route('/capture_stats', methods=['GET'])
+def capture_stats():
+    services = _requested_services()
+    if request.args.get('source') == 'all':
+        return jsonify([capture_service.get_stats() for capture_service in services])
+    return jsonify(services[0].get_stats())
+
+
+@bp.route('/sources', methods=['GET'])
+def list_sources():
+    from app import get_capture_services
+    from flask import current_app
+    
+    source_configs = current_app.config['CAPTURE_SOURCES']
+    return jsonify({
+        "default_source": current_app.config['DEFAULT_SOURCE'],
+        "sources": [
+            {
+                "id": source_id,
+                "type": source_configs.get(source_id, {}).get('type', 'picamera'),
+                "capturing": capture_service.is_capturing
+            }
+            for source_id, capture_service in get_capture_services().items()
+        ]
+    })
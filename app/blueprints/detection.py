@@ -1,64 +1,145 @@
+import io
+import json
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 import cv2
-import numpy as np
-from flask import Blueprint, jsonify, request, Response
-from app.config import create_message_frame
+from flask import Blueprint, jsonify, request, Response, current_app, stream_with_context
+from werkzeug.exceptions import RequestEntityTooLarge
+from app.services.detection_service import ModelNotReadyError
+from app.services.inference_scheduler import QueueFullError
+from app.utils.image_decode import decode_image, decode_raw, read_upload
+from app.utils.sse import keepalive, last_event_id
+from app.utils.streams import (
+    DetectionFeed, MjpegFeed, frame_body, frame_kind, latest_detections, parse_frame_options, serialize_result
+)
 
 bp = Blueprint('detection', __name__)
 
 
 @bp.route('/frame')
 def get_frame():
-    from app import get_capture_service, get_detection_service
-    
-    capture_service = get_capture_service()
-    detection_service = get_detection_service()
-    
-    if not capture_service.has_frame():
-        message_frame = create_message_frame()
-        ret, jpeg = cv2.imencode('.jpg', message_frame)
-        if not ret:
-            return Response(status=500)
-        return Response(jpeg.tobytes(), mimetype='image/jpeg')
-    
-    frame = capture_service.get_latest_frame()
-    annotated_frame = detection_service.annotate_frame(frame, conf=0.3)
-    
-    ret, jpeg = cv2.imencode('.jpg', annotated_frame)
-    if not ret:
-        return Response(status=500)
-    return Response(jpeg.tobytes(), mimetype='image/jpeg')
+    return _frame_response(frame_kind(request.args))
 
 
 @bp.route('/unprocessed_frame')
 def get_unprocessed_frame():
+    return _frame_response("raw")
+
+
+def _frame_options():
+    """Parse ?width=&height=&quality=&format= into get_encoded_frame keyword arguments."""
+    return parse_frame_options(request.args, current_app.config['MAX_FRAME_DIMENSION'])
+
+
+def _frame_response(kind):
+    """Serve the shared encoding of the latest frame, honouring If-None-Match."""
     from app import get_capture_service
     
-    capture_service = get_capture_service()
-    
-    if not capture_service.has_frame():
-        message_frame = create_message_frame()
-        ret, jpeg = cv2.imencode('.jpg', message_frame)
-        if not ret:
-            return Response(status=500)
-        return Response(jpeg.tobytes(), mimetype='image/jpeg')
+    capture_service = get_capture_service(request.args.get('source'))
+    try:
+        options = _frame_options()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
-    frame = capture_service.get_latest_frame()
-    ret, jpeg = cv2.imencode('.jpg', frame)
-    if not ret:
+    encoded = capture_service.get_encoded_frame(kind, **options)
+    data, mimetype, etag = frame_body(kind, capture_service, encoded, options)
+    if data is None:
         return Response(status=500)
-    return Response(jpeg.tobytes(), mimetype='image/jpeg')
+    if etag is None:
+        return Response(data, mimetype=mimetype)
+    
+    response = Response(data, mimetype=mimetype)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+
+@bp.route('/stream')
+def stream():
+    return _stream_response(frame_kind(request.args))
+
+
+@bp.route('/unprocessed_stream')
+def unprocessed_stream():
+    return _stream_response("raw")
+
+
+def _stream_response(kind):
+    """Push frames to the client as multipart/x-mixed-replace (MJPEG by default)."""
+    from app import get_capture_service
+    
+    capture_service = get_capture_service(request.args.get('source'))
+    try:
+        options = _frame_options()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    return Response(
+        _mjpeg_parts(MjpegFeed(capture_service, kind, options)),
+        mimetype='multipart/x-mixed-replace; boundary=frame',
+        headers={'Cache-Control': 'no-cache'}
+    )
+
+
+def _mjpeg_parts(feed, keepalive=5.0):
+    feed.update(feed.encode())
+    while True:
+        part = feed.part()
+        if part is not None:
+            yield part
+        if feed.capture_service.wait_for_frame(feed.seq, timeout=keepalive) is not None:
+            feed.update(feed.encode())
 
 
 @bp.route('/detections')
 def get_detections():
     from app import get_capture_service
     
-    capture_service = get_capture_service()
+    capture_service = get_capture_service(request.args.get('source'))
+    try:
+        body, headers = latest_detections(capture_service, request.args.get('format', 'json').lower())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return _body_response(body, headers)
+
+
+def _result_response(result, result_format):
+    """Serialise a DetectionResult as compact columnar JSON or packed float32 rows."""
+    try:
+        body, headers = serialize_result(result, result_format)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return _body_response(body, headers)
+
+
+def _body_response(body, headers):
+    if isinstance(body, bytes):
+        return Response(body, mimetype='application/octet-stream', headers=headers)
+    response = jsonify(body)
+    response.headers.update(headers)
+    return response
+
+
+@bp.route('/detections/stream')
+def stream_detections():
+    """Push each new detection set as a Server-Sent Event keyed by frame sequence number."""
+    from app import get_capture_service
     
-    detections = capture_service.get_latest_detections()
-    if not detections:
-        return jsonify([{"message": "Capture not started. Use POST /start_capture to begin."}])
-    return jsonify(detections)
+    capture_service = get_capture_service(request.args.get('source'))
+    return Response(
+        _detection_events(DetectionFeed(capture_service, last_event_id(request))),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+def _detection_events(feed, keepalive_interval=15.0):
+    while True:
+        event = feed.next_event()
+        if event is not None:
+            yield event
+        if feed.capture_service.wait_for_frame(feed.cursor, timeout=keepalive_interval) is None:
+            yield keepalive()
 
 
 @bp.route('/detect', methods=['POST'])
@@ -66,29 +147,53 @@ def detect():
     from app import get_detection_service
     import base64
     
-    if 'image' not in request.files:
-        return jsonify({"error": "No image part in request"}), 400
+    # Larger bodies are rejected with 413 while reading; werkzeug spools big files to disk
+    request.max_content_length = current_app.config['MAX_UPLOAD_SIZE']
+    detection_service = get_detection_service()
     
-    file = request.files['image']
-    if file.filename == '':
-        return jsonify({"error": "No selected file"}), 400
+    try:
+        data, decode = _request_image(detection_service)
+    except RequestEntityTooLarge:
+        return jsonify({"error": f"Upload larger than {current_app.config['MAX_UPLOAD_SIZE']} bytes"}), 413
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    # Check if annotated image is requested
+    include_image = request.args.get('annotate', 'false').lower() == 'true'
+    result_format = request.args.get('format', 'json').lower()
+    conf = 0.3
+    
+    # Simulated detections are random, so only real results are cached
+    cache = None if detection_service.simulation_mode else detection_service.result_cache
     
     try:
-        detection_service = get_detection_service()
+        results = None
+        if cache is not None:
+            model_name = detection_service.get_current_model()
+            key = cache.key(data, model_name, conf)
+            results = cache.get(key)
         
-        file_bytes = np.frombuffer(file.read(), np.uint8)
-        frame = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
+        if results is None or include_image:
+            frame, factor = decode()
+            if frame is None:
+                return jsonify({"error": "Could not decode image"}), 400
         
-        if frame is None:
-            return jsonify({"error": "Could not decode image"}), 400
+        if results is None:
+            _, frame_results = detection_service.detect_with_results(frame, conf=conf)
+            # Found on a possibly reduced decode; report boxes in the uploaded image's pixels
+            results = frame_results.scaled(factor)
+            # Skip results that raced with a model swap
+            if cache is not None and detection_service.get_current_model() == model_name:
+                cache.put(key, results)
+        elif include_image:
+            frame_results = results.scaled(1 / factor)
         
-        detections = detection_service.detect(frame, conf=0.3)
-        
-        # Check if annotated image is requested
-        include_image = request.args.get('annotate', 'false').lower() == 'true'
+        if result_format != 'json' and not include_image:
+            return _result_response(results, result_format)
         
+        detections = results.to_columns() if result_format == 'columns' else results.to_records()
         if include_image:
-            annotated_frame = detection_service.annotate_frame(frame, conf=0.3)
+            annotated_frame = detection_service.annotate_frame(frame, conf=conf, results=frame_results)
             ret, jpeg = cv2.imencode('.jpg', annotated_frame)
             if ret:
                 # Encode image to base64 for JSON response
@@ -101,10 +206,204 @@ def detect():
         
         return jsonify(detections)
     
+    except QueueFullError as e:
+        return jsonify({"error": str(e)}), 503, {'Retry-After': '1'}
+    except ModelNotReadyError as e:
+        return jsonify({"error": str(e)}), 503, {'Retry-After': '5'}
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@bp.route('/detect/cache')
+def detect_cache_stats():
+    from app import get_detection_service
+    
+    cache = get_detection_service().result_cache
+    if cache is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **cache.stats()})
+
+
+@bp.route('/detect/cache/clear', methods=['POST'])
+def clear_detect_cache():
+    from app import get_detection_service
+    
+    cache = get_detection_service().result_cache
+    if cache is not None:
+        cache.clear()
+    return jsonify({"status": "Detection cache cleared"})
+
+
+def _request_image(detection_service):
+    """Read the /detect upload as (data, decode). Raises ValueError for a bad request.
+
+    data is what the result cache hashes. decode() returns (frame, factor),
+    or (None, 1) if the image cannot be decoded; factor maps boxes on a
+    reduced-size decode back to the uploaded image. Raw
+    application/octet-stream bodies are read straight into the frame array.
+    """
+    if request.mimetype == 'application/octet-stream':
+        try:
+            width = int(request.headers['X-Image-Width'])
+            height = int(request.headers['X-Image-Height'])
+            channels = int(request.headers.get('X-Image-Channels', 3))
+        except (KeyError, ValueError):
+            raise ValueError("Raw uploads need integer X-Image-Width and X-Image-Height headers")
+        pixel_format = request.headers.get('X-Pixel-Format', 'bgr').lower()
+        if pixel_format not in ('bgr', 'rgb'):
+            raise ValueError("X-Pixel-Format must be bgr or rgb")
+        if width < 1 or height < 1 or channels not in (1, 3, 4):
+            raise ValueError("X-Image-Width and X-Image-Height must be positive and X-Image-Channels 1, 3 or 4")
+        # Checked before the frame is allocated: chunked bodies declare no Content-Length
+        max_bytes = current_app.config['MAX_UPLOAD_SIZE']
+        if width * height * channels > max_bytes:
+            raise RequestEntityTooLarge()
+        if request.content_length is not None and request.content_length != width * height * channels:
+            raise ValueError(f"Body is {request.content_length} bytes, expected {width * height * channels}")
+        frame = decode_raw(request.stream, width, height, channels, pixel_format, max_bytes=max_bytes)
+        return frame, lambda: (frame, 1)
+    
+    if 'image' not in request.files:
+        raise ValueError("No image part in request")
+    
+    file = request.files['image']
+    if file.filename == '':
+        raise ValueError("No selected file")
+    
+    data = read_upload(file)
+    return data, lambda: decode_image(data, _decode_min_size(detection_service))
+
+
+def _decode_min_size(detection_service):
+    if not current_app.config['REDUCED_DECODE']:
+        return None
+    return detection_service.get_input_size()
+
+
+@bp.route('/detect/batch', methods=['POST'])
+def detect_batch():
+    """Detect objects in many images, streaming one result per image in input order."""
+    from app import get_detection_service
+    
+    request.max_content_length = current_app.config['MAX_UPLOAD_SIZE']
+    try:
+        images = _batch_images(current_app.config['BATCH_MAX_IMAGES'], current_app.config['BATCH_MAX_UNPACKED_SIZE'])
+    except zipfile.BadZipFile:
+        return jsonify({"error": "Could not read zip archive"}), 400
+    except RequestEntityTooLarge as e:
+        return jsonify({"error": e.description}), 413
+    
+    if not images:
+        return jsonify({"error": "No images in request. Send 'images' files or a zip archive"}), 400
+    
+    # The scheduler runs each job as one forward pass, so larger batches would bypass its limit
+    max_batch = current_app.config['INFERENCE_MAX_BATCH']
+    batch_size = request.args.get('batch_size', min(current_app.config['BATCH_SIZE'], max_batch), type=int)
+    if batch_size is None or batch_size < 1:
+        return jsonify({"error": "batch_size must be a positive integer"}), 400
+    if batch_size > max_batch:
+        return jsonify({"error": f"batch_size must be at most {max_batch}"}), 400
+    
+    detection_service = get_detection_service()
+    results = _batch_results(
+        detection_service,
+        images,
+        batch_size,
+        current_app.config['BATCH_DECODE_WORKERS'],
+        min_size=_decode_min_size(detection_service)
+    )
+    
+    if request.args.get('format', 'json').lower() == 'ndjson':
+        body = (json.dumps(item) + "\n" for item in results)
+        return Response(stream_with_context(body), mimetype='application/x-ndjson')
+    return Response(stream_with_context(_json_array(results)), mimetype='application/json')
+
+
+def _batch_images(max_images, max_unpacked):
+    """Collect (name, bytes) pairs from multipart files, zip uploads or a raw zip body.
+
+    Uploads are read here because Flask closes request files once the view
+    returns, before the streamed response is generated. Raises
+    RequestEntityTooLarge beyond max_images images or max_unpacked bytes of
+    zip contents.
+    """
+    if request.mimetype in ('application/zip', 'application/x-zip-compressed'):
+        return _zip_images(request.get_data(), max_images, max_unpacked)
+    
+    images = []
+    unpacked = 0
+    for file in request.files.getlist('images') + request.files.getlist('image'):
+        if file.filename == '':
+            continue
+        if file.filename.lower().endswith('.zip') or file.mimetype == 'application/zip':
+            members = _zip_images(file.read(), max_images - len(images), max_unpacked - unpacked)
+            unpacked += sum(len(data) for _, data in members)
+            images.extend(members)
+        else:
+            images.append((file.filename, file.read()))
+        if len(images) > max_images:
+            raise RequestEntityTooLarge(f"More than {max_images} images in one batch")
+    return images
+
+
+def _zip_images(data, max_images, max_unpacked):
+    """Read the files in a zip archive, checking the sizes in its directory before extracting anything."""
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        members = [info for info in archive.infolist() if not info.is_dir()]
+        if len(members) > max_images:
+            raise RequestEntityTooLarge(f"More than {max_images} images in one batch")
+        # zipfile never returns more than a member's declared file_size, so the total holds
+        if sum(info.file_size for info in members) > max_unpacked:
+            raise RequestEntityTooLarge(f"Zip contents exceed {max_unpacked} bytes")
+        return [(info.filename, archive.read(info)) for info in members]
+
+
+def _batch_results(detection_service, images, batch_size, workers, conf=0.3, min_size=None):
+    """Yield one result dict per image, decoding the next batch while the current one runs."""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        def submit(start):
+            return [pool.submit(decode_image, data, min_size) for _, data in images[start:start + batch_size]]
+        
+        start = 0
+        pending = submit(start)
+        while pending:
+            decoded = []
+            for future in pending:
+                # A corrupt image must not cut the streamed array short
+                try:
+                    decoded.append(future.result())
+                except Exception:
+                    decoded.append((None, 1))
+            pending = submit(start + len(decoded))
+            
+            frames = [frame for frame, _ in decoded]
+            valid = [(frame, factor) for frame, factor in decoded if frame is not None]
+            try:
+                results = detection_service.detect_batch_results([frame for frame, _ in valid], conf=conf, block=True)
+                detections = iter([result.scaled(factor).to_records() for result, (_, factor) in zip(results, valid)])
+                error = None
+            except Exception as e:
+                error = str(e)
+            
+            for index, frame in enumerate(frames, start):
+                result = {"index": index, "name": images[index][0]}
+                if frame is None:
+                    result["error"] = "Could not decode image"
+                elif error is not None:
+                    result["error"] = error
+                else:
+                    result["detections"] = next(detections)
+                yield result
+            start += len(frames)
+
+
+def _json_array(items):
+    yield "["
+    for i, item in enumerate(items):
+        yield ("," if i else "") + json.dumps(item)
+    yield "]"
+
+
 @bp.route('/model', methods=['GET', 'POST'])
 def change_model():
     from app import get_detection_service
@@ -114,16 +413,24 @@ def change_model():
     if request.method == 'POST':
         requested_model = request.json.get("model_name")
         try:
-            detection_service.change_model(requested_model)
-            return jsonify({"status": f"Model changed to {requested_model}"})
+            # Loading happens in the background; only ?wait=true blocks until the swap
+            activation = detection_service.change_model(requested_model)
+            if request.args.get('wait', 'false').lower() == 'true' or activation.done():
+                activation.result()
+                return jsonify({"status": f"Model changed to {requested_model}"})
+            return jsonify({"status": f"Loading model {requested_model}", "loading": True}), 202
         except ValueError:
             return jsonify({"error": "Model not found"}), 404
         except Exception as e:
-            return jsonify({"error": str(e)}), 500
+            return jsonify({"error": f"Error changing model: {str(e)}"}), 500
     
+    model_status = detection_service.get_model_status()
     return jsonify({
         "current_model": detection_service.get_current_model(),
-        "available_models": detection_service.get_available_models()
+        "available_models": detection_service.get_available_models(),
+        "resident_models": model_status["resident_models"],
+        "loading_models": model_status["loading_models"],
+        "last_error": model_status["last_error"]
     })
 
 
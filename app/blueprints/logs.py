@@ -1,5 +1,7 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, Response
 from app.services.logger_service import LogLevel
+from app.utils.sse import keepalive, last_event_id
+from app.utils.streams import LogFeed
 
 bp = Blueprint('logs', __name__)
 
@@ -35,8 +37,44 @@ def get_logs():
     from app import get_logger
     
     logger = get_logger()
-    all_logs = logger.get_all_logs()
-    return jsonify({"logs": all_logs})
+    
+    if 'since' not in request.args and 'limit' not in request.args:
+        all_logs = logger.get_all_logs()
+        return jsonify({"logs": all_logs})
+    
+    # Incremental read: entries after ?since=<seq>, oldest first, at most ?limit=
+    since = request.args.get('since', 0, type=int)
+    limit = request.args.get('limit', None, type=int)
+    if limit is not None and limit < 1:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+    
+    latest_seq, clear_seq, entries = logger.get_logs_since(since, limit)
+    return jsonify({
+        "logs": entries,
+        "cursor": entries[-1]['seq'] if entries else max(since, latest_seq),
+        "latest_seq": latest_seq,
+        "cleared": clear_seq > since
+    })
+
+
+@bp.route('/logs/stream', methods=['GET'])
+def stream_logs():
+    """Push new log entries as Server-Sent Events, resuming from ?since= or Last-Event-ID."""
+    from app import get_logger
+    
+    logger = get_logger()
+    return Response(
+        _log_events(LogFeed(logger, last_event_id(request))),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+def _log_events(feed, keepalive_interval=15.0):
+    while True:
+        yield from feed.next_events()
+        if feed.logger.wait_for_logs(feed.cursor, timeout=keepalive_interval) is None:
+            yield keepalive()
 
 
 @bp.route('/logs/<level>', methods=['GET'])
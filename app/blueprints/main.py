@@ -30,9 +30,44 @@ def health():
     if not simulation_mode:
         model_loaded = detection_service.is_model_loaded()
     
+    ready, checks = _readiness()
     return jsonify({
         "status": "healthy",
+        "ready": ready,
+        "checks": checks,
         "simulation_mode": simulation_mode,
         "model_loaded": model_loaded,
         "model_name": detection_service.get_current_model() if not simulation_mode else None
     })
+
+
+@bp.route('/health/live')
+def liveness():
+    """The process is up and serving requests, even while the model and cameras start."""
+    return jsonify({"status": "alive"})
+
+
+@bp.route('/health/ready')
+def readiness():
+    """200 once the model is loaded and every source is open, 503 until then."""
+    ready, checks = _readiness()
+    status = "ready" if ready else "failed" if checks["model"] == "failed" else "starting"
+    return jsonify({"status": status, "checks": checks}), 200 if ready else 503
+
+
+def _readiness():
+    from app import get_capture_services, get_detection_service
+    
+    detection_service = get_detection_service()
+    model_ready = detection_service.simulation_mode or detection_service.is_model_loaded()
+    checks = {"model": "ready" if model_ready else "loading"}
+    error = detection_service.get_model_status()["last_error"]
+    if not model_ready and error:
+        checks["model"] = "failed"
+        checks["model_error"] = error
+    checks["sources"] = {
+        source_id: "ready" if capture_service.is_ready() else "starting"
+        for source_id, capture_service in get_capture_services().items()
+    }
+    ready = model_ready and all(state == "ready" for state in checks["sources"].values())
+    return ready, checks
@@ -0,0 +1,26 @@
+import time
+from flask import Blueprint, Response, g, request
+from app.services import metrics
+
+bp = Blueprint('metrics', __name__)
+
+
+@bp.before_app_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+
+@bp.after_app_request
+def record_request(response):
+    # Streaming responses are timed to their first byte, not until the client disconnects
+    started = g.pop('request_started', None)
+    if started is not None:
+        metrics.REQUEST_SECONDS.labels(
+            request.endpoint or "unmatched", request.method, response.status_code
+        ).observe(time.perf_counter() - started)
+    return response
+
+
+@bp.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
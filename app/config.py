@@ -1,7 +1,3 @@
-import cv2
-import numpy as np
-
-
 class Config:
     SIMULATION_MODE = False  # Using simulation mode locally
     DEFAULT_MODEL = "yolo11n-pt"  # Default model to use for detection
@@ -9,13 +5,63 @@ class Config:
     HOST = '0.0.0.0'
     PORT = 7926
     DEBUG = True
+    BATCH_SIZE = 8  # Images per forward pass for POST /detect/batch
+    BATCH_DECODE_WORKERS = 4  # Threads decoding uploaded images in parallel
+    BATCH_MAX_IMAGES = 256  # Images (including zip members) per POST /detect/batch
+    BATCH_MAX_UNPACKED_SIZE = 256 * 1024 * 1024  # Total uncompressed bytes of zip members per batch
+    INFERENCE_MAX_BATCH = 8  # Max frames per scheduled forward pass
+    INFERENCE_MAX_WAIT_MS = 5  # How long the scheduler waits to fill a batch
+    INFERENCE_QUEUE_DEPTH = 32  # Queued jobs before /detect returns 503
+    MODEL_POOL_SIZE = 2  # Loaded models kept resident for instant switching
+    PRELOAD_MODELS = []  # Models to load in the background at startup
+    CAPTURE_TARGET_FPS = 10  # Camera frame rate; 0 captures as fast as possible
+    # Capture sources by id; each gets its own capture thread and latest-frame state.
+    # Types: picamera (camera_num), fake, video (path, loop), rtsp (url), images (path, loop)
+    CAPTURE_SOURCES = {
+        "default": {"type": "picamera", "camera_num": 0},
+    }
+    DEFAULT_SOURCE = "default"
+    TRACKER_ENABLED = False  # Give capture detections stable track ids and log enter/leave events
+    TRACKER_IOU = 0.3  # Overlap needed to continue a track
+    TRACKER_MAX_MISSED = 5  # Inferences a track may go undetected before it leaves
+    TRACKER_INFERENCE_INTERVAL = 1  # Run the model every nth frame and propagate tracks in between
+    CHANGE_GATE_ENABLED = False  # Skip inference on frames that barely differ from the last inferred one
+    CHANGE_GATE_THRESHOLD = 3.0  # Mean absolute grayscale difference (0-255) that counts as a change
+    CHANGE_GATE_REFRESH_SECONDS = 5.0  # Run inference at least this often even on a static scene
+    PREVIEW_SCALE = 0.5  # Size of ?preview=true frames relative to the capture size
+    MAX_FRAME_DIMENSION = 4096  # Largest ?width= / ?height= accepted by frame endpoints
+    FRAME_POOL_SIZE = 4  # Reusable frame buffers per source (video/RTSP sources decode into them)
+    ENCODED_VARIANT_CACHE_SIZE = 16  # Encoded size/format variants kept per frame
+    MAX_UPLOAD_SIZE = 32 * 1024 * 1024  # Largest POST /detect body; bigger uploads get 413
+    RESULT_CACHE_SIZE = 256  # POST /detect results kept by image hash; 0 disables the cache
+    RESULT_CACHE_TTL = 300  # Seconds a cached result stays valid
+    RESULT_CACHE_DIR = None  # Directory to share the cache between worker processes
+    REDUCED_DECODE = True  # Decode large JPEGs at 1/2, 1/4 or 1/8 size when still >= the model input
+    # Multi-process mode: capture_process.py captures and runs inference once ("writer")
+    # and publishes into shared memory; web workers with "reader" serve from it
+    FRAME_BUS_ROLE = None  # None, "writer" or "reader"
+    FRAME_BUS_NAME = "yolo-frames"  # Shared memory block is "<name>-<source id>"
+    FRAME_BUS_SLOTS = 4  # Frames kept in the ring; readers encode within this many frames
+    FRAME_BUS_MAX_FRAME_BYTES = 1920 * 1080 * 3  # Largest frame a slot holds
+    FRAME_BUS_MAX_DETECTIONS = 256  # Detections stored per frame
+    ASGI_WORKERS = 8  # Threads for inference, encoding and Flask routes under asgi.py
+    ASGI_MAX_PENDING = 64  # Queued blocking jobs before asgi.py answers 503
+    ASGI_REQUEST_TIMEOUT = 30  # Seconds before a blocking job gets 504
+    ASGI_MAX_BODY_SIZE = 256 * 1024 * 1024  # Largest request body asgi.py will receive
 
 
 YOLO_MODEL_PATHS = {
     "yolo11n-pt": "models/best.pt",
+    "yolo11n-onnx": "models/best.onnx",
     "yolo11s-hef": "models/yolov11s.hef",
 }
 
+# Inference engine per model. Without an entry the engine follows the file
+# extension (.pt -> torch, .onnx -> onnx). Other keys are engine options.
+MODEL_ENGINES = {
+    "yolo11n-onnx": {"engine": "onnx", "export_from": "models/best.pt", "imgsz": 640},
+}
+
 HAILO_MODEL_PATH = "models/yolov11s.hef"
 
 CUSTOM_CLASS_NAMES = [
@@ -41,7 +87,11 @@ IMAGE_HEIGHT = 640
 CAMERA_CONFIG = {"format": "RGB888", "size": (IMAGE_WIDTH, IMAGE_HEIGHT)}
 
 
+# cv2 and numpy are imported on use, so reading the config stays cheap
 def create_fake_image():
+    import cv2
+    import numpy as np
+    
     height, width = IMAGE_HEIGHT, IMAGE_WIDTH
     gradiant_level = np.random.rand()
     vertical_gradient = np.tile(np.linspace(0, 255, height, dtype=np.uint8), (width, 1)).T
@@ -59,6 +109,9 @@ def create_fake_image():
 
 
 def create_message_frame(message="Capture not started. Use POST /start_capture to begin."):
+    import cv2
+    import numpy as np
+    
     height, width = IMAGE_HEIGHT, IMAGE_WIDTH
     message_frame = np.zeros((height, width, 3), dtype=np.uint8)
     message_frame[:] = (50, 50, 50)
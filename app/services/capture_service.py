@@ -1,51 +1,409 @@
 import threading
 import time
+from collections import OrderedDict
+import cv2
+from app.services import metrics
+from app.services.detection_result import DetectionResult
+from app.services.frame_pool import FramePool, read_only
+from app.services.logger_service import LogLevel
 from app.utils.camera import Camera
 
 
+# Output formats for encoded frames: extension, quality flag and mimetype
+IMAGE_FORMATS = {
+    "jpeg": (".jpg", cv2.IMWRITE_JPEG_QUALITY, "image/jpeg"),
+    "webp": (".webp", cv2.IMWRITE_WEBP_QUALITY, "image/webp"),
+    "png": (".png", None, "image/png"),
+}
+
+
+class UnknownSourceError(KeyError):
+    """Raised when a request names a capture source that is not configured."""
+
+
+class LatestFrameSlot:
+    """Single-item handoff between pipeline stages.
+
+    A put replaces any item the consumer has not taken yet, so a slow stage
+    always works on the newest frame and the producer never blocks.
+    """
+
+    def __init__(self):
+        self.ready = threading.Condition()
+        self.item = None
+        self.dropped = 0
+
+    def put(self, item):
+        """Hand over item; returns True if it replaced one the consumer never took."""
+        with self.ready:
+            replaced = self.item is not None
+            if replaced:
+                self.dropped += 1
+            self.item = item
+            self.ready.notify()
+            return replaced
+
+    def get(self, timeout=None):
+        with self.ready:
+            if not self.ready.wait_for(lambda: self.item is not None, timeout):
+                return None
+            item, self.item = self.item, None
+            return item
+
+
 class CaptureService:
-    def __init__(self, simulation_mode, detection_service, logger):
+    def __init__(self, simulation_mode, detection_service, logger, target_fps=10, source_id="default", camera=None,
+                 preview_scale=0.5, max_variants=16, frame_bus=None, frame_pool_size=4, tracker=None,
+                 inference_interval=1, change_gate=None, roi=None, tile_size=None, tile_overlap=0.2):
         self.simulation_mode = simulation_mode
         self.detection_service = detection_service
         self.logger = logger
-        self.camera = Camera(simulation_mode=simulation_mode)
+        self.source_id = source_id
+        self.camera = camera if camera is not None else Camera(simulation_mode=simulation_mode)
+        self.target_fps = target_fps
+        self.preview_scale = preview_scale
         
         self.latest_frame = None
         self.latest_detections = []
+        self.latest_results = None
+        self.frame_seq = 0
         self.data_lock = threading.Lock()
+        self.frame_ready = threading.Condition(self.data_lock)
+        # Called with the new frame_seq after each publish, e.g. to wake asyncio waiters
+        self.listeners = []
+        # Optional FrameBus that other processes serve this source from
+        self.frame_bus = frame_bus
+        
+        # JPEG bytes for the current frame_seq, encoded lazily and shared by all clients
+        self.stream_id = format(time.time_ns(), 'x')
+        self.encoded_seq = None
+        self.encoded_frames = OrderedDict()
+        self.max_variants = max_variants
+        self.encode_lock = threading.Lock()
+        
+        # Optional IouTracker; with inference_interval > 1 only every nth frame runs
+        # the model and the frames in between propagate the tracks
+        self.tracker = tracker
+        self.inference_interval = max(1, inference_interval)
+        self.frames_since_inference = 0
+        
+        # Optional ChangeGate; frames too similar to the last inferred one reuse its detections
+        self.change_gate = change_gate
+        self.last_detection = None
+        
+        # Optional [x1, y1, x2, y2] region the model sees; boxes are still reported in frame pixels
+        if roi is not None:
+            x1, y1, x2, y2 = (int(value) for value in roi)
+            if x1 < 0 or y1 < 0 or x2 <= x1 or y2 <= y1:
+                raise ValueError(f"Invalid roi {roi} for source {source_id}: need 0 <= x1 < x2 and 0 <= y1 < y2")
+            roi = (x1, y1, x2, y2)
+        self.roi = roi
+        # Optional tiled inference over the region, for small objects in large frames
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        
+        # Sources that can decode into a given buffer reuse pooled ones between frames
+        self.frame_pool = FramePool(frame_pool_size)
+        self.frame_shape = None
+        
+        # Camera and inference run in separate threads joined by a latest-wins slot
+        self.frame_slot = LatestFrameSlot()
+        self.stop_event = threading.Event()
+        self.stats_lock = threading.Lock()
+        self.stage_times = {}
+        self.measured_fps = 0.0
+        self.last_publish_time = None
+        self.last_error = None
         self.is_capturing = False
         self.capture_thread_instance = None
+        self.process_thread_instance = None
 
     def start_capture(self):
         if not self.is_capturing:
             self.is_capturing = True
-            self.capture_thread_instance = threading.Thread(target=self._capture_loop, daemon=True)
+            # Fresh event per run so threads from a previous run cannot be revived
+            self.stop_event = threading.Event()
+            self.last_detection = None
+            self.capture_thread_instance = threading.Thread(target=self._capture_loop, args=(self.stop_event,), daemon=True)
+            self.process_thread_instance = threading.Thread(target=self._process_loop, args=(self.stop_event,), daemon=True)
             self.capture_thread_instance.start()
+            self.process_thread_instance.start()
 
     def stop_capture(self):
         self.is_capturing = False
+        self.stop_event.set()
+
+    def is_ready(self):
+        """True once the source is open; cameras start in the background."""
+        is_ready = getattr(self.camera, 'is_ready', None)
+        return is_ready() if is_ready is not None else True
+
+    def _capture_loop(self, stop_event):
+        """Grab frames at target_fps (0 = as fast as the camera allows) into the slot."""
+        interval = 1.0 / self.target_fps if self.target_fps else 0
+        next_time = time.monotonic()
+        while not stop_event.is_set():
+            started = time.monotonic()
+            try:
+                frame = self._capture()
+            except Exception as e:
+                # A camera error must not end the thread while is_capturing still reads True
+                self._log_error(f"Frame capture failed: {e}")
+                # Start over with a plain capture, and do not spin on a camera that keeps failing
+                self.frame_shape = None
+                stop_event.wait(max(interval, 0.1))
+                continue
+            self._record_stage('capture', time.monotonic() - started)
+            if self.frame_slot.put(frame):
+                metrics.CAPTURE_DROPPED_FRAMES.labels(self.source_id).inc()
+            
+            if interval:
+                next_time = max(next_time + interval, time.monotonic())
+                stop_event.wait(next_time - time.monotonic())
 
-    def _capture_loop(self):
-        while self.is_capturing:
+    def _capture(self):
+        capture_into = getattr(self.camera, 'capture_into', None)
+        if capture_into is None or self.frame_shape is None:
             frame = self.camera.capture()
-            detections = self.detection_service.detect(frame, conf=0.3)
+        else:
+            frame = capture_into(self.frame_pool.acquire(self.frame_shape))
+        self.frame_shape = frame.shape
+        return frame
+
+    def _process_loop(self, stop_event):
+        """Preprocess, infer and publish the newest captured frame, skipping stale ones."""
+        while not stop_event.is_set():
+            frame = self.frame_slot.get(timeout=0.5)
+            if frame is None:
+                continue
             
-            with self.data_lock:
-                self.latest_frame = frame
-                self.latest_detections = detections
+            started = time.monotonic()
+            try:
+                frame = self._preprocess(frame)
+                preprocessed = time.monotonic()
+                detections, results = self._detect(frame)
+                inferred = time.monotonic()
+                self._publish(frame, detections, results)
+                published = time.monotonic()
+            except Exception as e:
+                # One bad frame must not end the loop while is_capturing still reads True
+                self._log_error(f"Frame processing failed: {e}")
+                continue
             
-            time.sleep(0.1)
+            self._record_stage('preprocess', preprocessed - started)
+            self._record_stage('inference', inferred - preprocessed)
+            self._record_stage('publish', published - inferred)
+            self._record_fps(published)
+
+    def _preprocess(self, frame):
+        return frame
+
+    def _detect(self, frame):
+        if not self.detection_service.simulation_mode and not self.detection_service.is_model_loaded():
+            # Publish plain frames while the model is still loading instead of failing the loop
+            return [], DetectionResult.empty()
+        if self.change_gate is not None:
+            changed = self.change_gate.changed(self._region(frame))
+            if not changed and self.last_detection is not None:
+                metrics.CAPTURE_INFERENCE_SKIPPED.labels(self.source_id).inc()
+                return self.last_detection
+        metrics.CAPTURE_INFERENCES.labels(self.source_id).inc()
+        self.last_detection = self._infer(frame)
+        return self.last_detection
+
+    def _infer(self, frame):
+        if self.tracker is None:
+            results = self._run_model(frame)
+            return results.to_records(), results
+        
+        self.frames_since_inference += 1
+        if len(self.tracker) and self.frames_since_inference < self.inference_interval:
+            results = self.tracker.propagate()
+        else:
+            self.frames_since_inference = 0
+            results, events = self.tracker.update(self._run_model(frame))
+            for event, track_id, name in events:
+                verb = "entered" if event == "enter" else "left"
+                self.logger.log(LogLevel.DETECTION, f"{name} {verb} (track {track_id})", f"tracker:{self.source_id}")
+        return results.to_records(), results
+
+    def _region(self, frame):
+        if self.roi is None:
+            return frame
+        x1, y1, x2, y2 = self.roi
+        return frame[y1:y2, x1:x2]
+
+    def _run_model(self, frame):
+        """Detect within the ROI, tiled if configured, and return a frame-coordinate DetectionResult."""
+        region = self._region(frame)
+        if self.tile_size:
+            results = self.detection_service.detect_tiled_results(region, self.tile_size, self.tile_overlap, conf=0.3,
+                                                                  block=True)
+        else:
+            _, results = self.detection_service.detect_with_results(region, conf=0.3, block=True)
+        if self.roi is None:
+            return results
+        return results.translated(self.roi[0], self.roi[1])
+
+    def _record_stage(self, stage, seconds, alpha=0.1):
+        metrics.CAPTURE_STAGE_SECONDS.labels(self.source_id, stage).observe(seconds)
+        with self.stats_lock:
+            previous = self.stage_times.get(stage)
+            self.stage_times[stage] = seconds if previous is None else previous + alpha * (seconds - previous)
+
+    def _record_fps(self, now, alpha=0.1):
+        with self.stats_lock:
+            if self.last_publish_time is not None and now > self.last_publish_time:
+                fps = 1.0 / (now - self.last_publish_time)
+                self.measured_fps = fps if not self.measured_fps else self.measured_fps + alpha * (fps - self.measured_fps)
+            self.last_publish_time = now
+            measured_fps = self.measured_fps
+        metrics.CAPTURE_FRAMES.labels(self.source_id).inc()
+        metrics.CAPTURE_FPS.labels(self.source_id).set(measured_fps)
+
+    def get_stats(self):
+        """Pipeline health: smoothed per-stage timings in ms, FPS and dropped frames."""
+        with self.stats_lock:
+            stages_ms = {stage: round(seconds * 1000, 2) for stage, seconds in self.stage_times.items()}
+            fps = round(self.measured_fps, 2)
+        return {
+            "source": self.source_id,
+            "capturing": self.is_capturing,
+            "target_fps": self.target_fps,
+            "fps": fps,
+            "frame_seq": self.get_frame_seq(),
+            "dropped_frames": self.frame_slot.dropped,
+            "frame_pool": self.frame_pool.stats(),
+            "change_gate": self.change_gate.stats() if self.change_gate is not None else None,
+            "roi": list(self.roi) if self.roi is not None else None,
+            "tile_size": self.tile_size,
+            "stages_ms": stages_ms
+        }
+
+    def _publish(self, frame, detections, results, seq=None):
+        # Published frames are immutable: readers share them without copying
+        frame = read_only(frame) if frame is not None else None
+        with self.data_lock:
+            self.latest_frame = frame
+            self.latest_detections = detections
+            self.latest_results = results
+            self.frame_seq = self.frame_seq + 1 if seq is None else seq
+            seq = self.frame_seq
+            self.frame_ready.notify_all()
+        if self.frame_bus is not None:
+            try:
+                self.frame_bus.publish(seq, frame, results)
+            except ValueError as e:
+                # e.g. a frame larger than the bus slots; local clients are still served
+                self._log_error(f"Frame not shared on the bus: {e}")
+        for callback in self.listeners:
+            callback(seq)
+
+    def _log_error(self, message):
+        # A failure usually repeats on every frame; log it once until something changes
+        if message != self.last_error:
+            self.last_error = message
+            self.logger.log(LogLevel.ERROR, message, f"capture:{self.source_id}")
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
 
     def get_latest_frame(self):
+        """Return the latest frame as a read-only array, without copying. Copy it to modify it."""
+        with self.data_lock:
+            return self.latest_frame
+
+    def get_latest_result(self):
+        """Return (seq, frame, results) for the most recently processed frame.
+
+        The frame is the shared read-only array, not a copy.
+        """
         with self.data_lock:
-            if self.latest_frame is None:
+            return self.frame_seq, self.latest_frame, self.latest_results
+
+    def get_encoded_frame(self, kind="raw", width=None, height=None, fmt="jpeg", quality=None):
+        """Return (seq, image_bytes) for the latest frame, or None before the first frame.
+
+        kind is "raw", "annotated" or "preview" (annotated and downscaled by
+        preview_scale). width/height bound the output size, keeping the aspect
+        ratio and never upscaling. fmt is a key of IMAGE_FORMATS. Each variant
+        is encoded at most once per frame sequence number and the newest
+        max_variants are kept; image_bytes is None if encoding failed.
+        """
+        with self.encode_lock:
+            seq, frame, results = self.get_latest_result()
+            if frame is None:
                 return None
-            return self.latest_frame.copy()
+            if self.encoded_seq != seq:
+                self.encoded_seq = seq
+                self.encoded_frames = OrderedDict()
+            
+            size = self._variant_size(frame, kind, width, height)
+            key = (kind, size, fmt, quality)
+            data = self.encoded_frames.get(key)
+            if data is None:
+                started = time.perf_counter()
+                data = self._encode(frame, results, kind, size, fmt, quality)
+                metrics.ENCODE_SECONDS.labels(kind, fmt).observe(time.perf_counter() - started)
+                if data is not None:
+                    self.encoded_frames[key] = data
+                    while len(self.encoded_frames) > self.max_variants:
+                        self.encoded_frames.popitem(last=False)
+            else:
+                self.encoded_frames.move_to_end(key)
+            return seq, data
+
+    def _variant_size(self, frame, kind, width, height):
+        frame_height, frame_width = frame.shape[:2]
+        scale = self.preview_scale if kind == "preview" else 1.0
+        if width:
+            scale = min(scale, width / frame_width)
+        if height:
+            scale = min(scale, height / frame_height)
+        return max(1, round(frame_width * scale)), max(1, round(frame_height * scale))
+
+    def _encode(self, frame, results, kind, size, fmt="jpeg", quality=None):
+        scale = size[0] / frame.shape[1]
+        if kind in ("annotated", "preview"):
+            # The renderer draws straight onto the downscaled copy
+            frame = self.detection_service.annotate_frame(frame, conf=0.3, results=results, scale=scale)
+        elif kind != "raw":
+            raise ValueError(f"Unknown frame kind: {kind}")
+        elif size != (frame.shape[1], frame.shape[0]):
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        
+        extension, quality_flag, _ = IMAGE_FORMATS[fmt]
+        params = [quality_flag, int(quality)] if quality is not None and quality_flag is not None else []
+        ret, encoded = cv2.imencode(extension, frame, params)
+        if not ret:
+            return None
+        return encoded.tobytes()
 
     def get_latest_detections(self):
         with self.data_lock:
             return self.latest_detections[:]
 
+    def wait_for_frame(self, after_seq, timeout=None):
+        """Block until a frame newer than after_seq is published.
+
+        Returns the latest sequence number, or None on timeout. Waiters always
+        skip to the newest frame, so a slow consumer drops intermediate frames
+        instead of queueing them, and the capture loop never waits on readers.
+        """
+        with self.frame_ready:
+            if self.frame_ready.wait_for(lambda: self.frame_seq > after_seq, timeout):
+                return self.frame_seq
+            return None
+
+    def get_latest_detection_set(self):
+        """Return (seq, detections) for the most recently processed frame."""
+        with self.data_lock:
+            return self.frame_seq, self.latest_detections[:]
+
+    def get_frame_seq(self):
+        with self.data_lock:
+            return self.frame_seq
+
     def has_frame(self):
         with self.data_lock:
             return self.latest_frame is not None
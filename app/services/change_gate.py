@@ -0,0 +1,62 @@
+import threading
+import time
+import cv2
+
+
+class ChangeGate:
+    """Decides whether a frame differs enough from the last inferred one to run the model.
+
+    Frames are compared as small grayscale thumbnails by mean absolute
+    difference (0-255), which costs a fraction of a millisecond against tens
+    of milliseconds for inference. A frame is let through when the difference
+    reaches threshold, or when refresh_seconds have passed since the last
+    inference so slow drifts and lighting changes are still picked up.
+    """
+
+    def __init__(self, threshold=3.0, refresh_seconds=5.0, size=(64, 36)):
+        self.threshold = threshold
+        self.refresh_seconds = refresh_seconds
+        self.size = size
+        self.reference = None
+        self.reference_time = None
+        self.last_difference = None
+        self.passed = 0
+        self.skipped = 0
+        self.lock = threading.Lock()
+
+    def changed(self, frame):
+        """Return True if frame should be inferred; it then becomes the new reference."""
+        thumbnail = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        if thumbnail.ndim == 3:
+            thumbnail = cv2.cvtColor(thumbnail, cv2.COLOR_BGR2GRAY)
+        now = time.monotonic()
+
+        with self.lock:
+            if self.reference is None or now - self.reference_time >= self.refresh_seconds:
+                difference = None
+            else:
+                difference = cv2.mean(cv2.absdiff(thumbnail, self.reference))[0]
+            self.last_difference = difference
+
+            if difference is not None and difference < self.threshold:
+                self.skipped += 1
+                return False
+            self.reference = thumbnail
+            self.reference_time = now
+            self.passed += 1
+            return True
+
+    def reset(self):
+        with self.lock:
+            self.reference = None
+
+    def stats(self):
+        with self.lock:
+            total = self.passed + self.skipped
+            return {
+                "inferred": self.passed,
+                "skipped": self.skipped,
+                "skip_rate": round(self.skipped / total, 4) if total else 0.0,
+                "last_difference": None if self.last_difference is None else round(self.last_difference, 2),
+                "threshold": self.threshold
+            }
@@ -0,0 +1,108 @@
+import numpy as np
+from app.config import CUSTOM_CLASS_NAMES
+
+# Display names indexed by class id, with "10" shortened to "T" once up front
+CLASS_NAME_TABLE = np.array([name.replace("10", "T") for name in CUSTOM_CLASS_NAMES], dtype=object)
+
+BINARY_DTYPE = np.dtype('<f4')
+BINARY_COLUMNS = ["x1", "y1", "x2", "y2", "confidence", "class_id"]
+
+
+class DetectionResult:
+    """Detections for one frame as parallel NumPy arrays.
+
+    xyxy is (N, 4) float32 in frame pixels, score is (N,) float32 and class_id
+    is (N,) int32. track_id is (N,) int64 when a tracker assigned identities,
+    otherwise None. Serialisers work on whole arrays so cost stays flat per box.
+    """
+
+    __slots__ = ('xyxy', 'score', 'class_id', 'track_id')
+
+    def __init__(self, xyxy, score, class_id, track_id=None):
+        self.xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.score = np.asarray(score, dtype=np.float32).reshape(-1)
+        self.class_id = np.asarray(class_id, dtype=np.int32).reshape(-1)
+        self.track_id = None if track_id is None else np.asarray(track_id, dtype=np.int64).reshape(-1)
+
+    @classmethod
+    def from_array(cls, boxes):
+        """Build from an engine's (N, 6) [x1, y1, x2, y2, score, class_id] array."""
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 6)
+        return cls(boxes[:, :4], boxes[:, 4], boxes[:, 5])
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros((0, 4)), np.zeros(0), np.zeros(0))
+
+    def __len__(self):
+        return len(self.score)
+
+    def __getitem__(self, index):
+        track_id = None if self.track_id is None else self.track_id[index]
+        return DetectionResult(self.xyxy[index], self.score[index], self.class_id[index], track_id)
+
+    @property
+    def class_names(self):
+        known = (self.class_id >= 0) & (self.class_id < len(CLASS_NAME_TABLE))
+        names = CLASS_NAME_TABLE[np.where(known, self.class_id, 0)]
+        if not known.all():
+            names = names.copy()
+            names[~known] = [f"class_{class_id}" for class_id in self.class_id[~known]]
+        return names
+
+    def scaled(self, factor):
+        """Copy with boxes multiplied by factor, e.g. back to a full-size image after a reduced decode."""
+        if factor == 1:
+            return self
+        return DetectionResult(self.xyxy * factor, self.score, self.class_id, self.track_id)
+
+    def translated(self, dx, dy):
+        """Copy with boxes shifted by (dx, dy), e.g. from a crop back to the full frame."""
+        if dx == 0 and dy == 0:
+            return self
+        return DetectionResult(self.xyxy + np.array([dx, dy, dx, dy], dtype=np.float32), self.score, self.class_id,
+                               self.track_id)
+
+    def to_array(self):
+        return np.column_stack([self.xyxy, self.score, self.class_id]).astype(np.float32)
+
+    def to_records(self, include_boxes=True):
+        """List of {"class_name", "confidence", "box"} dicts, the /detections format.
+
+        Tracked results also carry "track_id".
+        """
+        names = self.class_names.tolist()
+        scores = self.score.tolist()
+        if not include_boxes:
+            records = [{"class_name": name, "confidence": score} for name, score in zip(names, scores)]
+        else:
+            boxes = np.round(self.xyxy, 1).tolist()
+            records = [
+                {"class_name": name, "confidence": score, "box": box}
+                for name, score, box in zip(names, scores, boxes)
+            ]
+        if self.track_id is not None:
+            for record, track_id in zip(records, self.track_id.tolist()):
+                record["track_id"] = track_id
+        return records
+
+    def to_columns(self):
+        """Columnar JSON: one list per field, much smaller than records for many boxes."""
+        columns = {
+            "count": len(self),
+            "class_name": self.class_names.tolist(),
+            "class_id": self.class_id.tolist(),
+            "confidence": np.round(self.score, 4).tolist(),
+            "box": np.round(self.xyxy, 1).tolist()
+        }
+        if self.track_id is not None:
+            columns["track_id"] = self.track_id.tolist()
+        return columns
+
+    def to_bytes(self):
+        """Little-endian float32 rows of [x1, y1, x2, y2, confidence, class_id]."""
+        return self.to_array().astype(BINARY_DTYPE).tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls.from_array(np.frombuffer(data, dtype=BINARY_DTYPE).reshape(-1, 6))
@@ -1,70 +1,190 @@
 import random
-from ultralytics import YOLO
-from app.config import YOLO_MODEL_PATHS, CUSTOM_CLASS_NAMES
+import time
+from functools import partial
+import numpy as np
+from app.config import YOLO_MODEL_PATHS, CUSTOM_CLASS_NAMES, IMAGE_WIDTH, IMAGE_HEIGHT
+from app.services.detection_result import DetectionResult
+from app.services import metrics
+from app.services.engines import create_engine, nms
+from app.services.inference_scheduler import InferenceScheduler
+from app.services.model_registry import ModelRegistry
+from app.services.renderer import AnnotationRenderer
+
+
+class ModelNotReadyError(Exception):
+    """Raised by inference while no model is active, e.g. during startup."""
+
+
+def tile_windows(width, height, tile_size, overlap=0.2):
+    """(x1, y1, x2, y2) windows of at most tile_size covering the frame with at least overlap between neighbours."""
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        step = tile_size * (1 - overlap)
+        count = int(np.ceil((length - tile_size) / step)) + 1
+        return np.linspace(0, length - tile_size, count).round().astype(int).tolist()
+    
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in starts(height) for x in starts(width)
+    ]
 
 
 class DetectionService:
-    def __init__(self, simulation_mode=False, model_name="yolo11n"):
+    def __init__(self, simulation_mode=False, model_name="yolo11n", max_batch_size=8, max_wait_ms=5, queue_depth=32,
+                 model_pool_size=2, result_cache=None):
         self.simulation_mode = simulation_mode
         self.model = None
         self.model_name = model_name
         
+        # All inference goes through one scheduler so concurrent callers share batched forward passes
+        self.scheduler = InferenceScheduler(
+            self._run_model,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+            queue_depth=queue_depth
+        )
+        metrics.INFERENCE_QUEUE_DEPTH.set_function(self.scheduler.queue_depth)
+        
+        self.renderer = AnnotationRenderer()
+        
+        # Optional ResultCache for POST /detect, cleared whenever the active model changes
+        self.result_cache = result_cache
+        
+        # Models are loaded and warmed up in the background; activation swaps self.model
+        self.registry = ModelRegistry(self._load_model, max_resident=model_pool_size, on_activate=self._set_model)
+        
+        # The first model loads in the background so the app can answer /health right away;
+        # until it is active, inference raises ModelNotReadyError
         if not simulation_mode:
-            try:
-                self.model = YOLO(YOLO_MODEL_PATHS[model_name])
-                print(f"Model loaded successfully from {YOLO_MODEL_PATHS[model_name]}")
-            except Exception as e:
-                print(f"Error loading model: {e}")
+            self.registry.activate(model_name).add_done_callback(partial(self._report_load, model_name))
+
+    def detect(self, frame, conf=0.3, block=False):
+        detections, _ = self.detect_with_results(frame, conf, block=block)
+        return detections
+
+    def detect_with_results(self, frame, conf=0.3, block=False):
+        """Run inference once, returning the detection list and the DetectionResult.
+
+        The DetectionResult holds the boxes, scores and class ids as arrays, so
+        it can be passed to annotate_frame later without running the model a
+        second time. Raises QueueFullError when the scheduler is saturated,
+        unless block is True, and ModelNotReadyError before a model is loaded.
+        """
+        if self.simulation_mode:
+            result = self._simulate_detection()
+        else:
+            result = DetectionResult.from_array(self.scheduler.submit([frame], conf, block=block).result()[0])
+        return result.to_records(), result
+
+    def detect_batch(self, frames, conf=0.3, block=False):
+        """Run inference over a list of frames and return a detection list per frame."""
+        return [result.to_records() for result in self.detect_batch_results(frames, conf, block=block)]
+
+    def detect_batch_results(self, frames, conf=0.3, block=False):
+        """Run inference over a list of frames and return a DetectionResult per frame."""
+        if not frames:
+            return []
+        if self.simulation_mode:
+            return [self._simulate_detection() for _ in frames]
+        results = self.scheduler.submit(frames, conf, block=block).result()
+        return [DetectionResult.from_array(boxes) for boxes in results]
+
+    def detect_tiled_results(self, frame, tile_size=640, overlap=0.2, iou=0.5, conf=0.3, block=False,
+                             include_full_frame=True):
+        """Detect on overlapping tiles (SAHI-style) so small objects are not lost to downscaling.
 
-    def detect(self, frame, conf=0.3):
+        All tiles, plus the whole frame for objects larger than a tile, go
+        through the model as one batch. Boxes are shifted back to frame
+        coordinates and overlapping duplicates merged with per-class NMS.
+        """
         if self.simulation_mode:
             return self._simulate_detection()
+        windows = tile_windows(frame.shape[1], frame.shape[0], tile_size, overlap)
+        tiles = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in windows]
+        offsets = [(x1, y1) for x1, y1, _, _ in windows]
+        if include_full_frame and len(tiles) > 1:
+            tiles.append(frame)
+            offsets.append((0, 0))
+        
+        outputs = self.scheduler.submit(tiles, conf, block=block).result()
+        boxes = np.concatenate([
+            np.asarray(output, dtype=np.float32).reshape(-1, 6) + np.array([dx, dy, dx, dy, 0, 0], dtype=np.float32)
+            for output, (dx, dy) in zip(outputs, offsets)
+        ])
+        keep = nms(boxes[:, :4], boxes[:, 4], iou, boxes[:, 5].astype(np.int32))
+        return DetectionResult.from_array(boxes[keep])
+
+    def _report_load(self, model_name, future):
+        if future.exception() is not None:
+            print(f"Error loading model: {future.exception()}")
         else:
-            return self._yolo_detection(frame, conf)
+            print(f"Model loaded successfully from {YOLO_MODEL_PATHS[model_name]}")
+
+    def _run_model(self, frames, conf):
+        model = self.model
+        if model is None:
+            error = self.registry.status()["last_error"]
+            raise ModelNotReadyError(f"Model failed to load: {error}" if error else "Model is still loading")
+        results = model.infer(frames, conf=conf)
+        metrics.INFERENCE_BATCH_SIZE.observe(len(frames))
+        for stage, seconds in model.timings.items():
+            metrics.MODEL_STAGE_SECONDS.labels(stage).observe(seconds)
+        return results
 
     def _simulate_detection(self):
         num_detections = random.randint(1, 5)
-        detections = []
-        for _ in range(num_detections):
-            class_name = random.choice(CUSTOM_CLASS_NAMES)
-            confidence = round(random.uniform(0.5, 1.0), 2)
-            detections.append({
-                "class_name": class_name,
-                "confidence": confidence
-            })
-        return detections
+        class_id = np.random.randint(0, len(CUSTOM_CLASS_NAMES), num_detections)
+        score = np.round(np.random.uniform(0.5, 1.0, num_detections), 2)
+        top_left = np.random.uniform(0, [IMAGE_WIDTH - 100, IMAGE_HEIGHT - 140], (num_detections, 2))
+        xyxy = np.hstack([top_left, top_left + [100, 140]])
+        return DetectionResult(xyxy, score, class_id)
 
-    def _yolo_detection(self, frame, conf):
-        results = self.model(frame, conf=conf)
-        detections = []
-        for det in results[0].boxes.data.tolist():
-            score = det[4]
-            class_id = int(det[5])
-            class_name = CUSTOM_CLASS_NAMES[class_id] if class_id < len(CUSTOM_CLASS_NAMES) else f"class_{class_id}"
-            class_name = class_name.replace("10", "T")
-            detections.append({
-                "class_name": class_name,
-                "confidence": float(score)
-            })
-        return detections
+    def annotate_frame(self, frame, conf=0.3, results=None, scale=1.0):
+        """Draw detections on a frame, optionally downscaled by scale for previews.
 
-    def annotate_frame(self, frame, conf=0.3):
+        Pass the DetectionResult returned by detect_with_results to reuse it; the
+        model is only run when no precomputed results are given. The returned
+        image is a per-thread buffer reused by the next call on that thread.
+        """
         if self.simulation_mode:
-            return frame
-        else:
-            results = self.model(frame, conf=conf)
-            return results[0].plot()
+            return frame if scale == 1.0 else self.renderer.render(frame, None, scale=scale)
+        if results is None:
+            results = DetectionResult.from_array(self.scheduler.submit([frame], conf).result()[0])
+        return self.renderer.render(frame, results, scale=scale)
+
+    def _load_model(self, model_name):
+        started = time.monotonic()
+        engine = create_engine(model_name)
+        # Warm-up pass so the first real inference after a swap is not slow
+        engine.warmup()
+        metrics.MODEL_LOAD_SECONDS.labels(model_name).set(time.monotonic() - started)
+        return engine
+
+    def _set_model(self, model_name, model):
+        # Single reference swaps: the scheduler reads self.model once per batch
+        self.model = model
+        self.model_name = model_name
+        if self.result_cache is not None:
+            self.result_cache.clear()
 
     def change_model(self, model_name):
+        """Switch to a model without blocking. Returns a Future that resolves once it is active."""
+        if model_name not in YOLO_MODEL_PATHS:
+            raise ValueError("Model not found")
+        return self.registry.activate(model_name)
+
+    def preload_model(self, model_name):
         if model_name not in YOLO_MODEL_PATHS:
             raise ValueError("Model not found")
-        try:
-            new_model = YOLO(YOLO_MODEL_PATHS[model_name])
-            self.model = new_model
-            self.model_name = model_name
-            return True
-        except Exception as e:
-            raise Exception(f"Error changing model: {str(e)}")
+        return self.registry.preload(model_name)
+
+    def get_model_status(self):
+        return self.registry.status()
+
+    def get_input_size(self):
+        """Longest side the active model resizes frames to; larger inputs only cost decode time."""
+        return max(getattr(self.model, 'input_size', (640, 640)))
 
     def get_current_model(self):
         return self.model_name
@@ -0,0 +1,197 @@
+import os
+import time
+import cv2
+import numpy as np
+from app.config import YOLO_MODEL_PATHS, MODEL_ENGINES, IMAGE_WIDTH, IMAGE_HEIGHT
+
+
+class InferenceEngine:
+    """Runs a detection model on a list of BGR frames.
+
+    infer returns one float32 array per frame with rows of
+    [x1, y1, x2, y2, score, class_id] in that frame's pixel coordinates.
+    timings holds the seconds the last batch spent in preprocess, inference
+    and postprocess.
+    """
+
+    name = None
+    input_size = (640, 640)  # (height, width) frames are resized to
+    timings = {}
+
+    def infer(self, frames, conf=0.3):
+        raise NotImplementedError
+
+    def warmup(self):
+        self.infer([np.zeros((IMAGE_HEIGHT, IMAGE_WIDTH, 3), dtype=np.uint8)])
+
+
+class TorchEngine(InferenceEngine):
+    """Ultralytics YOLO on PyTorch."""
+
+    name = "torch"
+
+    def __init__(self, model_path, imgsz=640):
+        from ultralytics import YOLO
+        self.model = YOLO(model_path)
+        self.imgsz = imgsz
+        self.input_size = (imgsz, imgsz)
+
+    def infer(self, frames, conf=0.3):
+        results = self.model(list(frames), conf=conf, imgsz=self.imgsz, verbose=False)
+        # Ultralytics reports per-image milliseconds for each stage of the batch
+        self.timings = {stage: ms * len(results) / 1000 for stage, ms in results[0].speed.items()} if results else {}
+        return [result.boxes.data.cpu().numpy().astype(np.float32) for result in results]
+
+
+class OnnxEngine(InferenceEngine):
+    """YOLOv8/11 ONNX export on ONNX Runtime's CPU provider, with NumPy pre/post-processing.
+
+    If model_path does not exist and export_from names a .pt file, the model is
+    exported once with ultralytics (which then is the only use of torch).
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_path, imgsz=640, threads=None, iou=0.45, export_from=None):
+        import onnxruntime as ort
+
+        if not os.path.exists(model_path) and export_from:
+            model_path = export_onnx(export_from, model_path, imgsz)
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads or os.cpu_count() or 1
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # Exports are usually fixed at batch 1 unless exported with dynamic=True
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+        height, width = model_input.shape[2], model_input.shape[3]
+        self.input_size = (height, width) if isinstance(height, int) and isinstance(width, int) else (imgsz, imgsz)
+        self.iou = iou
+
+    def infer(self, frames, conf=0.3):
+        started = time.perf_counter()
+        letterboxed = [letterbox(frame, self.input_size) for frame in frames]
+        batch = np.stack([to_tensor(image) for image, _, _ in letterboxed])
+        preprocessed = time.perf_counter()
+
+        if self.dynamic_batch:
+            predictions = self.session.run(None, {self.input_name: batch})[0]
+        else:
+            predictions = np.concatenate([
+                self.session.run(None, {self.input_name: batch[i:i + 1]})[0] for i in range(len(batch))
+            ])
+        inferred = time.perf_counter()
+
+        results = [
+            postprocess(prediction, conf, self.iou, scale, pad, frame.shape[:2])
+            for prediction, (_, scale, pad), frame in zip(predictions, letterboxed, frames)
+        ]
+        self.timings = {
+            "preprocess": preprocessed - started,
+            "inference": inferred - preprocessed,
+            "postprocess": time.perf_counter() - inferred
+        }
+        return results
+
+
+def export_onnx(pt_path, onnx_path, imgsz=640):
+    from ultralytics import YOLO
+    exported = YOLO(pt_path).export(format="onnx", imgsz=imgsz)
+    if os.path.abspath(exported) != os.path.abspath(onnx_path):
+        os.replace(exported, onnx_path)
+    return onnx_path
+
+
+def letterbox(frame, size, color=(114, 114, 114)):
+    """Resize keeping aspect ratio and pad to size (h, w). Returns (image, scale, (pad_x, pad_y))."""
+    height, width = frame.shape[:2]
+    target_h, target_w = size
+    scale = min(target_h / height, target_w / width)
+    new_w, new_h = round(width * scale), round(height * scale)
+    pad_x, pad_y = (target_w - new_w) / 2, (target_h - new_h) / 2
+
+    if (new_w, new_h) != (width, height):
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    image = cv2.copyMakeBorder(frame, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
+    return image, scale, (left, top)
+
+
+def to_tensor(image):
+    """BGR HWC uint8 to RGB CHW float32 in [0, 1]."""
+    return np.ascontiguousarray(image[:, :, ::-1].transpose(2, 0, 1), dtype=np.float32) / 255.0
+
+
+def postprocess(prediction, conf, iou, scale, pad, shape):
+    """Decode one (4 + num_classes, anchors) YOLO output into [x1, y1, x2, y2, score, class_id] rows."""
+    prediction = prediction.T
+    class_scores = prediction[:, 4:]
+    class_ids = class_scores.argmax(axis=1)
+    scores = class_scores[np.arange(len(class_ids)), class_ids]
+    keep = scores >= conf
+    if not keep.any():
+        return np.zeros((0, 6), dtype=np.float32)
+
+    cx, cy, w, h = prediction[keep, :4].T
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+    scores, class_ids = scores[keep], class_ids[keep]
+
+    keep = nms(boxes, scores, iou, class_ids)
+    boxes = (boxes[keep] - np.array([pad[0], pad[1], pad[0], pad[1]])) / scale
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, shape[1])
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, shape[0])
+    return np.column_stack([boxes, scores[keep], class_ids[keep]]).astype(np.float32)
+
+
+def nms(boxes, scores, iou_threshold, class_ids=None):
+    """Greedy non-maximum suppression; returns kept indices by descending score.
+
+    With class_ids, boxes are offset per class so only same-class boxes suppress each other.
+    """
+    if len(boxes) == 0:
+        return np.zeros(0, dtype=np.int64)
+    if class_ids is not None:
+        boxes = boxes + (class_ids * (boxes.max() + 1))[:, None]
+
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1).clip(0) * (y2 - y1).clip(0)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        inter_w = (np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest])).clip(0)
+        inter_h = (np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest])).clip(0)
+        inter = inter_w * inter_h
+        overlap = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[overlap <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+ENGINES = {
+    "torch": TorchEngine,
+    "onnx": OnnxEngine,
+}
+
+ENGINE_BY_EXTENSION = {
+    ".pt": "torch",
+    ".onnx": "onnx",
+    ".hef": "hailo",
+}
+
+
+def create_engine(model_name):
+    """Build the engine for a model from YOLO_MODEL_PATHS and its MODEL_ENGINES options."""
+    model_path = YOLO_MODEL_PATHS[model_name]
+    options = dict(MODEL_ENGINES.get(model_name, {}))
+    engine_name = options.pop("engine", None) or ENGINE_BY_EXTENSION.get(os.path.splitext(model_path)[1].lower(), "torch")
+    if engine_name not in ENGINES:
+        raise ValueError(f"No '{engine_name}' engine available for {model_path}. Use one of: {list(ENGINES)}")
+    return ENGINES[engine_name](model_path, **options)
@@ -0,0 +1,171 @@
+import os
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+from app.services.detection_result import DetectionResult
+
+# Control block: [magic, latest_seq, stream_id, closed, slots, frame_bytes, max_detections, writer_pid]
+CONTROL_WORDS = 8
+MAGIC = 0x594F4C4F42555332  # "YOLOBUS2"
+# Per-slot header: [version, seq, height, width, channels, count, tracked]
+SLOT_WORDS = 8
+ALIGN = 64
+
+
+def _aligned(size):
+    return (size + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _slot_size(frame_bytes, max_detections):
+    return (_aligned(SLOT_WORDS * 8) + _aligned(frame_bytes) + _aligned(max_detections * 24)
+            + _aligned(max_detections * 8))
+
+
+class FrameBus:
+    """Ring of frames and detections in a multiprocessing.shared_memory block.
+
+    One writer process (the capture/inference process) publishes each frame
+    into the next slot; any number of reader processes (web workers) map the
+    same block and serve the newest slot without copying it. Every slot is a
+    seqlock: the writer makes its version odd while writing and even when
+    done, and a reader only trusts what it read if the version was even and
+    unchanged across the read. Readers never write to the block.
+
+    Frame views stay valid until the writer laps the ring, so a reader that
+    holds one while encoding should check is_valid(seq) afterwards.
+    """
+
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        self.control = np.ndarray((CONTROL_WORDS,), dtype=np.uint64, buffer=shm.buf)
+        self.slots = int(self.control[4])
+        self.frame_bytes = int(self.control[5])
+        self.max_detections = int(self.control[6])
+        self.slot_size = _slot_size(self.frame_bytes, self.max_detections)
+
+        self.headers, self.frames, self.detections, self.track_ids = [], [], [], []
+        for slot in range(self.slots):
+            offset = _aligned(CONTROL_WORDS * 8) + slot * self.slot_size
+            self.headers.append(np.ndarray((SLOT_WORDS,), dtype=np.uint64, buffer=shm.buf, offset=offset))
+            offset += _aligned(SLOT_WORDS * 8)
+            self.frames.append(np.ndarray((self.frame_bytes,), dtype=np.uint8, buffer=shm.buf, offset=offset))
+            offset += _aligned(self.frame_bytes)
+            self.detections.append(np.ndarray((self.max_detections, 6), dtype=np.float32, buffer=shm.buf, offset=offset))
+            offset += _aligned(self.max_detections * 24)
+            # Track ids get their own int64 column; float32 rows would round large ids
+            self.track_ids.append(np.ndarray((self.max_detections,), dtype=np.int64, buffer=shm.buf, offset=offset))
+
+        if not owner:
+            for array in self.frames + self.detections + self.track_ids:
+                array.flags.writeable = False
+
+    @classmethod
+    def create(cls, name, stream_id, slots=4, frame_bytes=1920 * 1080 * 3, max_detections=256):
+        """Create (or replace) the block as its only writer."""
+        try:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        size = _aligned(CONTROL_WORDS * 8) + slots * _slot_size(frame_bytes, max_detections)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        control = np.ndarray((CONTROL_WORDS,), dtype=np.uint64, buffer=shm.buf)
+        control[:] = [0, 0, stream_id, 0, slots, frame_bytes, max_detections, os.getpid()]
+        bus = cls(shm, owner=True)
+        # Magic goes last so readers never attach to a half-initialised block
+        bus.control[0] = MAGIC
+        return bus
+
+    @classmethod
+    def attach(cls, name):
+        """Map an existing block for reading. Raises FileNotFoundError if the writer is not up yet."""
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Before Python 3.13 every attach is tracked, and the tracker would
+            # unlink the writer's block when this reader exits
+            shm = shared_memory.SharedMemory(name=name)
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        control = np.ndarray((CONTROL_WORDS,), dtype=np.uint64, buffer=shm.buf)
+        if int(control[0]) != MAGIC:
+            del control
+            shm.close()
+            raise FileNotFoundError(f"Frame bus {name} is not initialised")
+        del control
+        return cls(shm, owner=False)
+
+    @property
+    def stream_id(self):
+        return int(self.control[2])
+
+    @property
+    def closed(self):
+        return bool(self.control[3])
+
+    def latest_seq(self):
+        return int(self.control[1])
+
+    def publish(self, seq, frame, result):
+        """Write frame and its DetectionResult into the slot for seq. Writer only."""
+        if frame.nbytes > self.frame_bytes:
+            raise ValueError(f"Frame of {frame.nbytes} bytes does not fit the bus ({self.frame_bytes} bytes per slot)")
+        slot = seq % self.slots
+        header = self.headers[slot]
+        rows = result.to_array()[:self.max_detections] if result is not None else np.zeros((0, 6), np.float32)
+        tracked = result is not None and result.track_id is not None
+
+        header[0] += 1
+        self.frames[slot][:frame.nbytes] = frame.reshape(-1)
+        self.detections[slot][:len(rows)] = rows
+        if tracked:
+            self.track_ids[slot][:len(rows)] = result.track_id[:len(rows)]
+        height, width = frame.shape[:2]
+        header[1:7] = [seq, height, width, frame.shape[2] if frame.ndim == 3 else 1, len(rows), int(tracked)]
+        header[0] += 1
+        self.control[1] = seq
+
+    def read(self, retries=8):
+        """Return (seq, frame, result) for the newest frame, or None if there is none yet.
+
+        frame is a read-only view into the shared block; result is a small copy.
+        """
+        for _ in range(retries):
+            seq = self.latest_seq()
+            if seq == 0:
+                return None
+            slot = seq % self.slots
+            header = self.headers[slot]
+            version = int(header[0])
+            if version % 2 or int(header[1]) != seq:
+                continue
+            _, height, width, channels, count, tracked = (int(value) for value in header[1:7])
+            frame = self.frames[slot][:height * width * channels].reshape(height, width, channels)
+            result = DetectionResult.from_array(self.detections[slot][:count].copy())
+            if tracked:
+                result.track_id = self.track_ids[slot][:count].copy()
+            if int(header[0]) == version:
+                return seq, frame, result
+        return None
+
+    def is_valid(self, seq):
+        """True while the slot read for seq has not been overwritten."""
+        header = self.headers[seq % self.slots]
+        return int(header[0]) % 2 == 0 and int(header[1]) == seq
+
+    def close(self):
+        """Detach; the writer also marks the block closed and unlinks it."""
+        if self.owner:
+            self.control[3] = 1
+        self.control = None
+        self.headers = self.frames = self.detections = self.track_ids = []
+        try:
+            self.shm.close()
+        except BufferError:
+            # Frame views are still held somewhere; the mapping goes away with them
+            pass
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,67 @@
+import threading
+import weakref
+import numpy as np
+
+
+def read_only(frame):
+    """A read-only view of frame (or frame itself if it already is read-only)."""
+    if not frame.flags.writeable:
+        return frame
+    view = frame.view()
+    view.flags.writeable = False
+    return view
+
+
+class FramePool:
+    """A few preallocated frame buffers that the capture loop decodes into.
+
+    A buffer is handed out again only once its lease has ended. Each acquire
+    returns a new array over the pooled memory and the buffer is released
+    when that array is garbage collected. numpy points every view and slice
+    of the array back at it, so the lease lasts while a reader (or the
+    inference pipeline) still holds any part of the frame. When all buffers
+    are leased, acquire returns a fresh array, which is then simply garbage
+    collected instead of joining the pool.
+    """
+
+    def __init__(self, size=4):
+        self.size = size
+        self.buffers = []
+        self.free = []
+        self.lock = threading.Lock()
+        self.allocations = 0
+
+    def acquire(self, shape, dtype=np.uint8):
+        """Return a writable buffer of shape that nobody else holds."""
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        with self.lock:
+            index = next((index for index, free in enumerate(self.free) if free), None)
+            if index is None:
+                if len(self.buffers) >= self.size:
+                    self.allocations += 1
+                    return np.empty(shape, dtype=dtype)
+                index = len(self.buffers)
+                self.buffers.append(self._allocate(nbytes))
+                self.free.append(True)
+            elif len(self.buffers[index]) != nbytes:
+                self.buffers[index] = self._allocate(nbytes)
+            self.free[index] = False
+        frame = np.ndarray(shape, dtype=dtype, buffer=self.buffers[index])
+        weakref.finalize(frame, self._release, index)
+        return frame
+
+    def _allocate(self, nbytes):
+        self.allocations += 1
+        # A bytearray rather than an ndarray, so views of a leased frame
+        # keep that frame alive instead of the pooled memory directly
+        return bytearray(nbytes)
+
+    def _release(self, index):
+        # Runs from the garbage collector, possibly while acquire holds the
+        # lock on this thread, so it only flips a flag
+        self.free[index] = True
+
+    def stats(self):
+        with self.lock:
+            return {"buffers": len(self.buffers), "free": sum(self.free), "allocations": self.allocations}
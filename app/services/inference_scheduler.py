@@ -0,0 +1,89 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class QueueFullError(Exception):
+    """Raised when the inference queue is at capacity and the caller won't wait."""
+
+
+class InferenceScheduler:
+    """Collects inference jobs from every caller and runs them as batched forward passes.
+
+    A single worker thread owns the model. It takes the first queued job, then
+    keeps collecting until max_batch_size frames are gathered or max_wait_ms
+    has passed, and runs one forward pass per confidence threshold. Each
+    caller gets a Future resolving to the raw results for its own frames.
+    """
+
+    def __init__(self, run_batch, max_batch_size=8, max_wait_ms=5, queue_depth=32):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.jobs = queue.Queue(maxsize=queue_depth)
+        self.worker = None
+        self.worker_lock = threading.Lock()
+
+    def submit(self, frames, conf=0.3, block=False, timeout=None):
+        """Queue frames for inference and return a Future of their results.
+
+        With block=False a full queue raises QueueFullError immediately, so
+        request threads are rejected instead of piling up. Single producers
+        such as the capture loop pass block=True to wait for a slot.
+        """
+        self._ensure_worker()
+        future = Future()
+        try:
+            self.jobs.put((list(frames), conf, future), block=block, timeout=timeout)
+        except queue.Full:
+            raise QueueFullError("Inference queue is full")
+        return future
+
+    def queue_depth(self):
+        return self.jobs.qsize()
+
+    def _ensure_worker(self):
+        with self.worker_lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self._run, daemon=True)
+                self.worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self.jobs.get()]
+            size = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    job = self.jobs.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(job)
+                size += len(job[0])
+            self._run_jobs(batch)
+
+    def _run_jobs(self, batch):
+        by_conf = {}
+        for job in batch:
+            by_conf.setdefault(job[1], []).append(job)
+
+        for conf, jobs in by_conf.items():
+            jobs = [job for job in jobs if job[2].set_running_or_notify_cancel()]
+            if not jobs:
+                continue
+            frames = [frame for job in jobs for frame in job[0]]
+            try:
+                results = self.run_batch(frames, conf)
+            except Exception as e:
+                for job in jobs:
+                    job[2].set_exception(e)
+                continue
+
+            start = 0
+            for job_frames, _, future in jobs:
+                future.set_result(results[start:start + len(job_frames)])
+                start += len(job_frames)
@@ -1,6 +1,9 @@
+import heapq
 import threading
+import time
 from datetime import datetime
 from enum import Enum
+from itertools import islice, takewhile
 
 
 class LogLevel(Enum):
@@ -11,41 +14,99 @@ class LogLevel(Enum):
     DECISION = "DECISION"
 
 
+class LogRing:
+    """Fixed-capacity ring of compact (seq, time, level, message, context) tuples.
+
+    Appends are O(1) and must be serialised by the caller. Reads take no lock:
+    they snapshot the write counter, read the slots, then drop any slot the
+    writer may have overwritten in the meantime. One spare slot takes the
+    entry being appended, so the newest capacity entries stay readable.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.size = capacity + 1
+        self.slots = [None] * self.size
+        self.written = 0
+
+    def append(self, entry):
+        self.slots[self.written % self.size] = entry
+        self.written += 1
+
+    def __len__(self):
+        return min(self.written, self.capacity)
+
+    def read(self, after_seq=0):
+        end = self.written
+        start = self._first_after(max(0, end - self.capacity), end, after_seq)
+        entries = [self.slots[i % self.size] for i in range(start, end)]
+
+        # Anything older than written + 1 - size may have been overwritten
+        # mid-read; the + 1 covers an append that has stored its slot but not
+        # yet counted it
+        lost = max(0, self.written + 1 - self.size) - start
+        return entries[lost:] if lost > 0 else entries
+
+    def _first_after(self, lo, hi, seq):
+        # Entries are appended in seq order, so binary search over ring indices
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.slots[mid % self.size][0] <= seq:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+
 class Logger:
     def __init__(self):
         self.log_mutex = threading.Lock()
-        self.log_buffer = {
-            LogLevel.ERROR: [],
-            LogLevel.WARNING: [],
-            LogLevel.INFO: [],
-            LogLevel.DETECTION: [],
-            LogLevel.DECISION: []
-        }
         self.max_buffer_size = 1000
+        self.log_buffer = self._new_buffer()
+
+        # Every entry gets a monotonic sequence number so readers can ask for
+        # "everything after seq N". A clear also consumes a number (clear_seq).
+        self.log_seq = 0
+        self.clear_seq = 0
+        self.log_ready = threading.Condition(self.log_mutex)
+        # Called with the new log_seq after each write or clear
+        self.listeners = []
+
+    def _new_buffer(self):
+        return {level: LogRing(self.max_buffer_size) for level in LogLevel}
 
     @staticmethod
     def timestamp():
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
+    @staticmethod
+    def format_timestamp(created):
+        return datetime.fromtimestamp(created).strftime("%Y-%m-%d %H:%M:%S")
+
     @staticmethod
     def level_to_string(level):
         return level.value
 
+    @classmethod
+    def to_dict(cls, entry):
+        seq, created, level_str, message, context = entry
+        return {
+            'seq': seq,
+            'timestamp': cls.format_timestamp(created),
+            'level': level_str,
+            'message': message,
+            'context': context
+        }
+
     def write_log(self, level, message, context=""):
+        created = time.time()
+        level_str = self.level_to_string(level)
         with self.log_mutex:
-            timestamp = self.timestamp()
-            level_str = self.level_to_string(level)
-            
-            entry = {
-                'timestamp': timestamp,
-                'level': level_str,
-                'message': message,
-                'context': context
-            }
-            
-            self.log_buffer[level].append(entry)
-            if len(self.log_buffer[level]) > self.max_buffer_size:
-                self.log_buffer[level] = self.log_buffer[level][-self.max_buffer_size:]
+            self.log_seq += 1
+            self.log_buffer[level].append((self.log_seq, created, level_str, message, context))
+            seq = self.log_seq
+            self.log_ready.notify_all()
+        self._notify(seq)
 
     def log(self, level, message, context=""):
         if level in [LogLevel.ERROR, LogLevel.WARNING, LogLevel.INFO, LogLevel.DETECTION, LogLevel.DECISION]:
@@ -58,19 +119,49 @@ class Logger:
             )
 
     def get_all_logs(self):
-        with self.log_mutex:
-            return {level.value: logs[:] for level, logs in self.log_buffer.items()}
+        buffer = self.log_buffer
+        return {level.value: [self.to_dict(entry) for entry in ring.read()] for level, ring in buffer.items()}
 
     def get_logs_by_level(self, level):
+        return [self.to_dict(entry) for entry in self.log_buffer[level].read()]
+
+    def get_logs_since(self, seq, limit=None):
+        """Return (latest_seq, clear_seq, entries newer than seq ordered by seq).
+
+        At most limit entries are returned, oldest first, so callers can page
+        forward using the last returned seq as the next cursor.
+        """
         with self.log_mutex:
-            return self.log_buffer[level][:]
+            latest_seq, clear_seq = self.log_seq, self.clear_seq
+            buffer = self.log_buffer
+        merged = heapq.merge(*(ring.read(seq) for ring in buffer.values()))
+        # Entries logged after latest_seq was taken belong to the next read
+        current = takewhile(lambda entry: entry[0] <= latest_seq, merged)
+        entries = [self.to_dict(entry) for entry in islice(current, limit)]
+        return latest_seq, clear_seq, entries
+
+    def wait_for_logs(self, after_seq, timeout=None):
+        """Block until something newer than after_seq is logged or cleared.
+
+        Returns the latest sequence number, or None on timeout.
+        """
+        with self.log_ready:
+            if self.log_ready.wait_for(lambda: self.log_seq > after_seq, timeout):
+                return self.log_seq
+            return None
 
     def clear_logs(self):
         with self.log_mutex:
-            self.log_buffer = {
-                LogLevel.ERROR: [],
-                LogLevel.WARNING: [],
-                LogLevel.INFO: [],
-                LogLevel.DETECTION: [],
-                LogLevel.DECISION: []
-            }
+            self.log_seq += 1
+            self.clear_seq = self.log_seq
+            self.log_buffer = self._new_buffer()
+            seq = self.log_seq
+            self.log_ready.notify_all()
+        self._notify(seq)
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def _notify(self, seq):
+        for callback in self.listeners:
+            callback(seq)
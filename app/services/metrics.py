@@ -0,0 +1,261 @@
+import threading
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _ThreadCells:
+    """Per-thread accumulators for one metric child.
+
+    Every thread adds into its own list, so updates take no lock and never
+    contend with each other. The lock is only taken the first time a thread
+    touches the metric and when totals are read. Cells of finished threads
+    are folded into retired, so per-request threads do not pile up.
+    """
+
+    def __init__(self, width):
+        self.width = width
+        self.local = threading.local()
+        self.cells = []
+        self.retired = [0.0] * width
+        self.lock = threading.Lock()
+
+    def cell(self):
+        cell = getattr(self.local, 'cell', None)
+        if cell is None:
+            cell = self.local.cell = [0.0] * self.width
+            with self.lock:
+                if len(self.cells) >= 64:
+                    self._retire()
+                self.cells.append((threading.current_thread(), cell))
+        return cell
+
+    def totals(self):
+        with self.lock:
+            self._retire()
+            totals = list(self.retired)
+            for _, cell in self.cells:
+                for index, value in enumerate(cell):
+                    totals[index] += value
+        return totals
+
+    def _retire(self):
+        live = []
+        for thread, cell in self.cells:
+            if thread.is_alive():
+                live.append((thread, cell))
+            else:
+                for index, value in enumerate(cell):
+                    self.retired[index] += value
+        self.cells = live
+
+
+class _CounterChild:
+    def __init__(self):
+        self.cells = _ThreadCells(1)
+
+    def inc(self, amount=1):
+        self.cells.cell()[0] += amount
+
+    def samples(self, name, labels):
+        return [(name, labels, self.cells.totals()[0])]
+
+
+class _GaugeChild:
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+
+    def set(self, value):
+        # A single reference assignment; the last writer wins
+        self.value = value
+
+    def set_function(self, function):
+        """Read the value from function() at scrape time instead, e.g. a queue length."""
+        self.function = function
+
+    def samples(self, name, labels):
+        return [(name, labels, self.function() if self.function is not None else self.value)]
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # One count per bucket, one for +Inf, then the sum
+        self.cells = _ThreadCells(len(buckets) + 2)
+
+    def observe(self, value):
+        cell = self.cells.cell()
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def samples(self, name, labels):
+        totals = self.cells.totals()
+        samples = []
+        count = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), totals):
+            count += bucket_count
+            samples.append((f"{name}_bucket", labels + (("le", _format_value(bound)),), count))
+        samples.append((f"{name}_sum", labels, totals[-1]))
+        samples.append((f"{name}_count", labels, count))
+        return samples
+
+
+class Metric:
+    """A named metric with optional labels; each label combination is a child.
+
+    Metrics without labels can be updated directly; labelled ones through
+    labels(*values). Children are created once and can be kept by callers
+    to skip the lookup on hot paths.
+    """
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children = {}
+        self.lock = threading.Lock()
+
+    def labels(self, *values):
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+        key = tuple(str(value) for value in values)
+        child = self.children.get(key)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self):
+        samples = []
+        for values, child in list(self.children.items()):
+            samples.extend(child.samples(self.name, tuple(zip(self.labelnames, values))))
+        return samples
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def set_function(self, function):
+        self.labels().set_function(function)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+
+class MetricsRegistry:
+    """Holds metrics and renders them in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (name, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# Process-wide metrics, updated by the services and blueprints and served at /metrics
+REGISTRY = MetricsRegistry()
+
+CAPTURE_STAGE_SECONDS = REGISTRY.histogram(
+    "yolo_capture_stage_seconds", "Capture pipeline stage time per frame", ("source", "stage"))
+CAPTURE_FRAMES = REGISTRY.counter(
+    "yolo_capture_frames_total", "Frames published by the capture pipeline", ("source",))
+CAPTURE_DROPPED_FRAMES = REGISTRY.counter(
+    "yolo_capture_dropped_frames_total", "Captured frames replaced before inference could take them", ("source",))
+CAPTURE_INFERENCES = REGISTRY.counter(
+    "yolo_capture_inferences_total", "Captured frames passed on to inference", ("source",))
+CAPTURE_INFERENCE_SKIPPED = REGISTRY.counter(
+    "yolo_capture_inference_skipped_total", "Captured frames the change gate found unchanged and did not infer",
+    ("source",))
+CAPTURE_FPS = REGISTRY.gauge(
+    "yolo_capture_fps", "Smoothed published frames per second", ("source",))
+ENCODE_SECONDS = REGISTRY.histogram(
+    "yolo_encode_seconds", "Time to render and encode a frame variant", ("kind", "format"))
+MODEL_STAGE_SECONDS = REGISTRY.histogram(
+    "yolo_model_stage_seconds", "Engine preprocess, inference and postprocess time per batch", ("stage",))
+INFERENCE_BATCH_SIZE = REGISTRY.histogram(
+    "yolo_inference_batch_size", "Frames per forward pass", buckets=BATCH_BUCKETS)
+INFERENCE_QUEUE_DEPTH = REGISTRY.gauge(
+    "yolo_inference_queue_depth", "Inference jobs waiting for the scheduler")
+MODEL_LOAD_SECONDS = REGISTRY.gauge(
+    "yolo_model_load_seconds", "Time the last load and warm-up of a model took", ("model",))
+REQUEST_SECONDS = REGISTRY.histogram(
+    "yolo_http_request_seconds", "Time to the start of the response per endpoint", ("endpoint", "method", "status"))
@@ -0,0 +1,96 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class ModelRegistry:
+    """Loads models in the background and keeps the most recently used ones resident.
+
+    loader(name) must return a ready (warmed-up) model. activate(name) loads the
+    model off the request path if needed, then hands it to on_activate(name, model);
+    callers swap a single reference there, so in-flight inferences finish on the
+    old model and the next one picks up the new model. At most max_resident
+    models stay loaded; the active model is never evicted.
+    """
+
+    def __init__(self, loader, max_resident=2, on_activate=None):
+        self.loader = loader
+        self.max_resident = max_resident
+        self.on_activate = on_activate
+        self.resident = OrderedDict()
+        self.pending = {}
+        self.active_name = None
+        self.requested_name = None
+        self.last_error = None
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-loader")
+
+    def preload(self, name):
+        """Start loading a model without activating it. Returns a Future of the model."""
+        with self.lock:
+            if name in self.resident:
+                self.resident.move_to_end(name)
+                future = Future()
+                future.set_result(self.resident[name])
+                return future
+            if name not in self.pending:
+                self.pending[name] = self.executor.submit(self._load, name)
+            return self.pending[name]
+
+    def activate(self, name):
+        """Make a model active once it is loaded. Returns a Future of the model.
+
+        If another activation is requested before this one finishes loading,
+        the later request wins and this model is only kept resident.
+        """
+        with self.lock:
+            self.requested_name = name
+        activated = Future()
+
+        def swap(loaded):
+            try:
+                model = loaded.result()
+            except Exception as e:
+                with self.lock:
+                    self.last_error = f"{name}: {e}"
+                activated.set_exception(e)
+                return
+            with self.lock:
+                if self.requested_name == name:
+                    self.active_name = name
+                    self.last_error = None
+                    if self.on_activate is not None:
+                        self.on_activate(name, model)
+            activated.set_result(model)
+
+        self.preload(name).add_done_callback(swap)
+        return activated
+
+    def _load(self, name):
+        try:
+            model = self.loader(name)
+        except Exception:
+            with self.lock:
+                self.pending.pop(name, None)
+            raise
+        with self.lock:
+            self.pending.pop(name, None)
+            self.resident[name] = model
+            self._evict()
+        return model
+
+    def _evict(self):
+        for name in list(self.resident):
+            if len(self.resident) <= self.max_resident:
+                break
+            if name not in (self.active_name, self.requested_name):
+                del self.resident[name]
+
+    def status(self):
+        with self.lock:
+            return {
+                "active_model": self.active_name,
+                "resident_models": list(self.resident),
+                "loading_models": list(self.pending),
+                "last_error": self.last_error
+            }
@@ -0,0 +1,93 @@
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+from app.config import COLORS
+
+
+class AnnotationRenderer:
+    """Draws DetectionResults onto a reusable per-thread buffer.
+
+    Labels are pre-rendered once per (class, confidence bucket, font size) and
+    blitted as small sprites, so the per-frame cost is a buffer copy, one
+    rectangle per box and a slice assignment per label. The returned image is
+    reused by the next render call on the same thread; encode or copy it first.
+    Each thread keeps at most max_buffers of the most recently used shapes.
+    """
+
+    def __init__(self, font_scale=0.6, thickness=1, box_thickness=2, confidence_step=0.05, max_buffers=2):
+        self.font_scale = font_scale
+        self.thickness = thickness
+        self.box_thickness = box_thickness
+        self.confidence_step = confidence_step
+        self.max_buffers = max_buffers
+        self.sprites = {}
+        self.local = threading.local()
+
+    def render(self, frame, result, scale=1.0):
+        """Return frame with result drawn on it, optionally downscaled by scale for previews."""
+        height, width = frame.shape[:2]
+        if scale != 1.0:
+            width, height = max(1, round(width * scale)), max(1, round(height * scale))
+        canvas = self._buffer((height, width) + frame.shape[2:], frame.dtype)
+        if scale != 1.0:
+            cv2.resize(frame, (width, height), dst=canvas, interpolation=cv2.INTER_AREA)
+        else:
+            np.copyto(canvas, frame)
+
+        if result is None or len(result) == 0:
+            return canvas
+
+        boxes = np.round(result.xyxy * scale).astype(np.int32).tolist()
+        buckets = np.round(result.score / self.confidence_step).astype(np.int32).tolist()
+        class_ids = result.class_id.tolist()
+        names = result.class_names.tolist()
+        font_scale = round(self.font_scale * max(scale, 0.5), 1)
+        box_thickness = max(1, round(self.box_thickness * scale))
+
+        for (x1, y1, x2, y2), bucket, class_id, name in zip(boxes, buckets, class_ids, names):
+            color = COLORS[class_id % len(COLORS)]
+            cv2.rectangle(canvas, (x1, y1), (x2, y2), color, box_thickness)
+            sprite = self._sprite(class_id, name, bucket, font_scale, color)
+            self._blit(canvas, sprite, x1, y1 - sprite.shape[0])
+        return canvas
+
+    def _buffer(self, shape, dtype):
+        buffers = getattr(self.local, 'buffers', None)
+        if buffers is None:
+            buffers = self.local.buffers = OrderedDict()
+        key = (shape, dtype.str)
+        if key in buffers:
+            buffers.move_to_end(key)
+            return buffers[key]
+        # Clients choose output sizes, so old shapes are dropped instead of kept forever
+        while len(buffers) >= self.max_buffers:
+            buffers.popitem(last=False)
+        buffer = buffers[key] = np.empty(shape, dtype=dtype)
+        return buffer
+
+    def _sprite(self, class_id, name, bucket, font_scale, color):
+        key = (class_id, bucket, font_scale)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            text = f"{name} {bucket * self.confidence_step:.2f}"
+            (text_w, text_h), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, self.thickness)
+            sprite = np.empty((text_h + baseline + 4, text_w + 4, 3), dtype=np.uint8)
+            sprite[:] = color
+            # Dark text on light palette colours, white text on dark ones
+            text_color = (0, 0, 0) if sum(color) > 382 else (255, 255, 255)
+            cv2.putText(sprite, text, (2, text_h + 2), cv2.FONT_HERSHEY_SIMPLEX, font_scale, text_color,
+                        self.thickness, cv2.LINE_AA)
+            self.sprites[key] = sprite
+        return sprite
+
+    @staticmethod
+    def _blit(canvas, sprite, x, y):
+        # Keep labels inside the frame: below the box top edge if there is no room above
+        height, width = canvas.shape[:2]
+        sprite_h, sprite_w = sprite.shape[:2]
+        y = min(max(y, 0), height - sprite_h)
+        x = min(max(x, 0), width - sprite_w)
+        if x < 0 or y < 0:
+            return
+        canvas[y:y + sprite_h, x:x + sprite_w] = sprite
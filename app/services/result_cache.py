@@ -0,0 +1,189 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from app.services.detection_result import DetectionResult
+
+
+class MemoryCacheBackend:
+    """In-process LRU of DetectionResults with a per-entry expiry time."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, result = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return result
+
+    def put(self, key, result, ttl):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class DiskCacheBackend:
+    """DetectionResults as small binary files in a directory shared by several workers.
+
+    Entries expire by file age and the oldest files are pruned once the
+    directory holds more than max_entries. Writes go through a temporary file
+    and a rename, so readers in other processes never see partial entries.
+    """
+
+    def __init__(self, path, max_entries=4096):
+        self.path = path
+        self.max_entries = max_entries
+        self.evictions = 0
+        os.makedirs(path, exist_ok=True)
+
+    def get(self, key):
+        filename = os.path.join(self.path, key)
+        try:
+            expires = os.path.getmtime(filename)
+            if expires < time.time():
+                os.remove(filename)
+                return None
+            with open(filename, 'rb') as f:
+                return DetectionResult.from_bytes(f.read())
+        except OSError:
+            return None
+
+    def put(self, key, result, ttl):
+        """Store result if possible; other workers may prune or clear at the same time."""
+        filename = os.path.join(self.path, key)
+        temp = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp, 'wb') as f:
+                f.write(result.to_bytes())
+            # The file's mtime holds its expiry time
+            expires = time.time() + ttl
+            os.utime(temp, (expires, expires))
+            os.replace(temp, filename)
+        except OSError:
+            try:
+                os.remove(temp)
+            except OSError:
+                pass
+            return
+        self._prune()
+
+    def _prune(self):
+        try:
+            names = [name for name in os.listdir(self.path) if not name.endswith('.tmp')]
+        except OSError:
+            return
+        if len(names) <= self.max_entries:
+            return
+        ages = []
+        for name in names:
+            filename = os.path.join(self.path, name)
+            try:
+                ages.append((os.path.getmtime(filename), filename))
+            except OSError:
+                # Already pruned or cleared by another worker
+                pass
+        ages.sort()
+        for _, filename in ages[:len(ages) - self.max_entries]:
+            try:
+                os.remove(filename)
+                self.evictions += 1
+            except OSError:
+                pass
+
+    def clear(self):
+        try:
+            names = os.listdir(self.path)
+        except OSError:
+            return
+        # Temporary files belong to writes still in progress in other workers
+        for name in names:
+            if name.endswith('.tmp'):
+                continue
+            try:
+                os.remove(os.path.join(self.path, name))
+            except OSError:
+                pass
+
+    def __len__(self):
+        try:
+            return len([name for name in os.listdir(self.path) if not name.endswith('.tmp')])
+        except OSError:
+            return 0
+
+
+class ResultCache:
+    """Detection results keyed on (image content hash, model name, conf).
+
+    Identical uploads (client retries, the same image from several services)
+    skip decoding and inference. The backend is a MemoryCacheBackend by
+    default; pass a DiskCacheBackend to share entries between worker processes.
+    """
+
+    def __init__(self, max_entries=256, ttl=300, backend=None):
+        self.ttl = ttl
+        self.backend = backend if backend is not None else MemoryCacheBackend(max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(data, model_name, conf):
+        """Hash of the uploaded bytes (or a decoded frame and its shape), model name and conf."""
+        shape = getattr(data, 'shape', None) if getattr(data, 'ndim', 1) > 1 else None
+        if shape is not None:
+            data = np.ascontiguousarray(data)
+        digest = hashlib.blake2b(data, digest_size=16)
+        digest.update(f"|{shape}|{model_name}|{conf:.4f}".encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        result = self.backend.get(key)
+        with self.lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def put(self, key, result):
+        """Store a result; a failing backend only costs the cache entry, never the request."""
+        try:
+            self.backend.put(key, result, self.ttl)
+        except OSError:
+            pass
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.backend.evictions,
+            "ttl_seconds": self.ttl
+        }
@@ -0,0 +1,106 @@
+import threading
+import time
+from app.services.capture_service import CaptureService
+from app.services.frame_bus import FrameBus
+from app.utils.camera import Camera
+
+
+class SharedCaptureService(CaptureService):
+    """Serves a source that another process captures, by following its FrameBus.
+
+    Web workers use this in place of CaptureService, so they open no camera and
+    run no capture inference. A follower thread polls the bus and publishes
+    each new frame as a read-only view into the shared block, keeping the
+    writer's sequence numbers and stream id so ETags agree across workers.
+    Encoding, streaming and waiting work exactly as for a local source.
+    """
+
+    def __init__(self, detection_service, logger, bus_name, source_id="default", preview_scale=0.5, max_variants=16,
+                 poll_interval=0.005):
+        # Never captured from; frames come from the bus
+        super().__init__(True, detection_service, logger, target_fps=0, source_id=source_id,
+                         camera=Camera(simulation_mode=True), preview_scale=preview_scale, max_variants=max_variants)
+        self.bus_name = bus_name
+        self.poll_interval = poll_interval
+        self.bus = None
+
+    def start_capture(self):
+        """Start following the bus; capture itself runs in the writer process."""
+        if not self.is_capturing:
+            self.is_capturing = True
+            self.stop_event = threading.Event()
+            self.capture_thread_instance = threading.Thread(target=self._follow_loop, args=(self.stop_event,),
+                                                            daemon=True)
+            self.capture_thread_instance.start()
+
+    def _follow_loop(self, stop_event):
+        last_frame_time = time.monotonic()
+        while not stop_event.is_set():
+            if self.bus is None or self.bus.closed:
+                if not self._attach():
+                    stop_event.wait(1.0)
+                    continue
+
+            seq = self.bus.latest_seq()
+            if seq != self.get_frame_seq():
+                snapshot = self.bus.read()
+                if snapshot is not None:
+                    seq, frame, result = snapshot
+                    self._publish(frame, result.to_records(), result, seq=seq)
+                    self._record_fps(time.monotonic())
+                    last_frame_time = time.monotonic()
+            elif time.monotonic() - last_frame_time > 2.0:
+                # A restarted writer replaces the block without marking the old one closed
+                self._attach()
+                last_frame_time = time.monotonic()
+            stop_event.wait(self.poll_interval)
+
+    def _attach(self):
+        try:
+            bus = FrameBus.attach(self.bus_name)
+        except FileNotFoundError:
+            return False
+        if self.bus is not None and bus.stream_id == self.bus.stream_id and not self.bus.closed:
+            bus.close()
+            return True
+
+        previous, self.bus = self.bus, bus
+        # A new writer restarts sequence numbers, so nothing from the old stream may be reused
+        with self.encode_lock, self.data_lock:
+            self.stream_id = format(bus.stream_id, 'x')
+            self.latest_frame = None
+            self.latest_detections = []
+            self.latest_results = None
+            self.frame_seq = 0
+            self.encoded_seq = None
+        if previous is not None:
+            previous.close()
+        return True
+
+    def is_ready(self):
+        # Ready once the capture process's bus has been found
+        return self.bus is not None
+
+    def _encode(self, frame, results, kind, size, fmt="jpeg", quality=None):
+        data = super()._encode(frame, results, kind, size, fmt, quality)
+        # The writer may have lapped the ring while this view was being encoded
+        if self.bus is None or not self.bus.is_valid(self.encoded_seq):
+            return None
+        return data
+
+    def get_latest_frame(self):
+        # Unlike local frames, bus slots are reused once the writer laps the ring
+        seq, frame, _ = self.get_latest_result()
+        if frame is None:
+            return None
+        frame = frame.copy()
+        if self.bus is None or not self.bus.is_valid(seq):
+            return None
+        return frame
+
+    def get_stats(self):
+        stats = super().get_stats()
+        stats["shared"] = True
+        stats["bus"] = self.bus_name
+        stats["attached"] = self.bus is not None
+        return stats
@@ -0,0 +1,114 @@
+import numpy as np
+from app.services.detection_result import DetectionResult
+
+
+def iou_matrix(a, b):
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy boxes as an (N, M) array."""
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = (bottom_right - top_left).clip(0).prod(axis=2)
+    area_a = (a[:, 2:] - a[:, :2]).clip(0).prod(axis=1)
+    area_b = (b[:, 2:] - b[:, :2]).clip(0).prod(axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def greedy_match(scores, threshold):
+    """Pair rows with columns by descending score above threshold. Returns (rows, cols) index arrays."""
+    candidates = np.argwhere(scores >= threshold)
+    order = np.argsort(-scores[candidates[:, 0], candidates[:, 1]], kind='stable')
+    rows, cols, used_rows, used_cols = [], [], set(), set()
+    for row, col in candidates[order].tolist():
+        if row not in used_rows and col not in used_cols:
+            used_rows.add(row)
+            used_cols.add(col)
+            rows.append(row)
+            cols.append(col)
+    return np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64)
+
+
+class IouTracker:
+    """Gives detections stable track ids across frames by box overlap.
+
+    Each frame's detections are matched to the tracks' predicted boxes by IoU,
+    within the same class (a card keeps its rank and suit). Matched tracks
+    take the new box, an exponentially smoothed confidence and a per-frame
+    velocity; unmatched detections start tracks and unmatched tracks coast on
+    their velocity until they have been missed max_missed times. propagate()
+    advances the tracks one frame without detections, for frames where
+    inference is skipped. All per-track state is kept in parallel arrays.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_missed=5, smoothing=0.5):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.smoothing = smoothing
+        self.next_id = 1
+        self.observed = np.zeros((0, 4), dtype=np.float32)
+        self.velocity = np.zeros((0, 4), dtype=np.float32)
+        self.since = np.zeros(0, dtype=np.int32)
+        self.score = np.zeros(0, dtype=np.float32)
+        self.class_id = np.zeros(0, dtype=np.int32)
+        self.track_id = np.zeros(0, dtype=np.int64)
+        self.missed = np.zeros(0, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.track_id)
+
+    def update(self, result):
+        """Match a frame's DetectionResult to the tracks.
+
+        Returns (tracked, events): tracked is a DetectionResult of the tracks
+        seen in this frame with track_id set, and events is a list of
+        ("enter" | "leave", track_id, class_name) tuples.
+        """
+        self.since += 1
+        overlap = iou_matrix(self._predicted(), result.xyxy)
+        overlap[self.class_id[:, None] != result.class_id[None, :]] = 0
+        tracks, detections = greedy_match(overlap, self.iou_threshold)
+
+        boxes = result.xyxy[detections]
+        self.velocity[tracks] = (boxes - self.observed[tracks]) / self.since[tracks, None]
+        self.observed[tracks] = boxes
+        self.since[tracks] = 0
+        self.score[tracks] += self.smoothing * (result.score[detections] - self.score[tracks])
+        self.missed += 1
+        self.missed[tracks] = 0
+
+        new = np.ones(len(result), dtype=bool)
+        new[detections] = False
+        new_ids = np.arange(self.next_id, self.next_id + new.sum(), dtype=np.int64)
+        self.next_id += len(new_ids)
+        self._append(result[new], new_ids)
+        events = [("enter", track_id, name) for track_id, name in zip(new_ids.tolist(), result[new].class_names)]
+
+        gone = self.missed > self.max_missed
+        if gone.any():
+            names = self._result(gone).class_names
+            events += [("leave", track_id, name) for track_id, name in zip(self.track_id[gone].tolist(), names)]
+            self._keep(~gone)
+        return self._result(self.missed == 0), events
+
+    def propagate(self):
+        """Advance the tracks one frame on their velocity and return the visible ones."""
+        self.since += 1
+        return self._result(self.missed == 0)
+
+    def _predicted(self):
+        return self.observed + self.velocity * self.since[:, None]
+
+    def _result(self, mask):
+        return DetectionResult(self._predicted()[mask], self.score[mask], self.class_id[mask], self.track_id[mask])
+
+    def _append(self, result, track_id):
+        self.observed = np.concatenate([self.observed, result.xyxy])
+        self.velocity = np.concatenate([self.velocity, np.zeros_like(result.xyxy)])
+        self.since = np.concatenate([self.since, np.zeros(len(result), dtype=np.int32)])
+        self.score = np.concatenate([self.score, result.score])
+        self.class_id = np.concatenate([self.class_id, result.class_id])
+        self.track_id = np.concatenate([self.track_id, track_id])
+        self.missed = np.concatenate([self.missed, np.zeros(len(result), dtype=np.int32)])
+
+    def _keep(self, mask):
+        self.observed, self.velocity, self.since = self.observed[mask], self.velocity[mask], self.since[mask]
+        self.score, self.class_id = self.score[mask], self.class_id[mask]
+        self.track_id, self.missed = self.track_id[mask], self.missed[mask]
@@ -1,26 +1,125 @@
-from app.config import CAMERA_CONFIG, create_fake_image
+import os
+import threading
+import time
+import cv2
+from app.config import CAMERA_CONFIG, create_fake_image, create_message_frame
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
 
 
 class Camera:
-    def __init__(self, simulation_mode=False):
+    """Raspberry Pi camera, or generated fake frames in simulation mode.
+
+    The camera is opened on a background thread, including the two seconds
+    it needs to settle exposure, so constructing a Camera never delays app
+    startup. capture() waits for that to finish. If the camera cannot be
+    opened, it falls back to fake frames.
+    """
+
+    def __init__(self, simulation_mode=False, camera_num=0):
         self.simulation_mode = simulation_mode
-        if not simulation_mode:
-            try:
-                from picamera2 import Picamera2
-                import time
-                self.camera = Picamera2()
-                config = self.camera.create_preview_configuration(main=CAMERA_CONFIG)
-                self.camera.configure(config)
-                self.camera.start()
-                time.sleep(2)
-            except (ImportError, RuntimeError, IndexError, AttributeError, Exception) as e:
-                print(f"Camera initialization failed: {e}. Falling back to simulation mode")
-                self.simulation_mode = True
-        if self.simulation_mode:
-            pass
+        self.camera_num = camera_num
+        self.camera = None
+        self.ready = threading.Event()
+        if simulation_mode:
+            self.ready.set()
+        else:
+            threading.Thread(target=self._open, daemon=True, name=f"camera-{camera_num}-init").start()
+
+    def _open(self):
+        try:
+            from picamera2 import Picamera2
+            camera = Picamera2(self.camera_num)
+            config = camera.create_preview_configuration(main=CAMERA_CONFIG)
+            camera.configure(config)
+            camera.start()
+            time.sleep(2)
+            self.camera = camera
+        except (ImportError, RuntimeError, IndexError, AttributeError, Exception) as e:
+            print(f"Camera initialization failed: {e}. Falling back to simulation mode")
+            self.simulation_mode = True
+        finally:
+            self.ready.set()
+
+    def is_ready(self):
+        return self.ready.is_set()
 
     def capture(self):
+        self.ready.wait()
         if self.simulation_mode:
             return create_fake_image()
         else:
             return self.camera.capture_array()
+
+
+class VideoSource:
+    """Frames from a video file or network stream (RTSP/HTTP) via OpenCV.
+
+    Files restart from the beginning when loop is set; streams are reopened
+    after a read failure. A message frame is returned while no frame is available.
+    """
+
+    def __init__(self, url, loop=True):
+        self.url = url
+        self.loop = loop
+        self.capture_device = cv2.VideoCapture(url)
+
+    def capture(self):
+        ret, frame = self.capture_device.read()
+        if ret:
+            return frame
+        if self.loop and os.path.isfile(self.url):
+            self.capture_device.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        else:
+            self.capture_device.release()
+            self.capture_device = cv2.VideoCapture(self.url)
+        ret, frame = self.capture_device.read()
+        if ret:
+            return frame
+        return create_message_frame(f"Source unavailable: {self.url}")
+
+    def capture_into(self, out):
+        """Like capture, but decodes into out (e.g. a FramePool buffer) when the frame size matches."""
+        ret, frame = self.capture_device.read(out)
+        if ret:
+            return frame
+        return self.capture()
+
+
+class ImageDirectorySource:
+    """Cycles through the images in a directory in name order."""
+
+    def __init__(self, path, loop=True):
+        self.path = path
+        self.loop = loop
+        self.files = sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self.index = 0
+
+    def capture(self):
+        if self.index >= len(self.files):
+            if not self.loop or not self.files:
+                return create_message_frame(f"No more images in {self.path}")
+            self.index = 0
+        frame = cv2.imread(self.files[self.index], cv2.IMREAD_COLOR)
+        self.index += 1
+        if frame is None:
+            return create_message_frame(f"Could not read {self.files[self.index - 1]}")
+        return frame
+
+
+def create_source(source_config, simulation_mode=False):
+    """Build a frame source from a CAPTURE_SOURCES entry."""
+    source_type = source_config.get("type", "picamera")
+    if source_type == "picamera":
+        return Camera(simulation_mode=simulation_mode, camera_num=source_config.get("camera_num", 0))
+    if source_type == "fake":
+        return Camera(simulation_mode=True)
+    if source_type in ("video", "rtsp"):
+        url = source_config.get("url", source_config.get("path"))
+        return VideoSource(url, loop=source_config.get("loop", source_type == "video"))
+    if source_type == "images":
+        return ImageDirectorySource(source_config["path"], loop=source_config.get("loop", True))
+    raise ValueError(f"Unknown source type: {source_type}. Use 'picamera', 'fake', 'video', 'rtsp' or 'images'")
@@ -0,0 +1,108 @@
+import struct
+import cv2
+import numpy as np
+
+# IMREAD_REDUCED_* flags by downscale factor; libjpeg decodes these at the
+# smaller size directly instead of decoding full resolution and resizing.
+REDUCED_FLAGS = {
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+}
+
+# Start-of-frame markers carry the image size; C4, C8 and CC are not SOF markers
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def read_upload(file):
+    """Read an uploaded (possibly disk-spooled) file straight into a uint8 array."""
+    stream = file.stream
+    stream.seek(0, 2)
+    size = stream.tell()
+    stream.seek(0)
+    buffer = np.empty(size, dtype=np.uint8)
+    view = memoryview(buffer)
+    read = 0
+    while read < size:
+        count = stream.readinto(view[read:])
+        if not count:
+            break
+        read += count
+    return buffer[:read]
+
+
+def jpeg_dimensions(data):
+    """Return (width, height) from a JPEG header without decoding, or None."""
+    header = bytes(data[:262144])
+    if header[:2] != b'\xff\xd8':
+        return None
+    offset = 2
+    while offset + 9 <= len(header):
+        if header[offset] != 0xFF:
+            return None
+        marker = header[offset + 1]
+        if marker == 0xFF:
+            offset += 1
+            continue
+        if marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack('>HH', header[offset + 5:offset + 9])
+            return width, height
+        length = struct.unpack('>H', header[offset + 2:offset + 4])[0]
+        offset += 2 + length
+    return None
+
+
+def decode_image(data, min_size=None):
+    """Decode encoded image bytes, returning (frame, factor) or (None, 1).
+
+    When min_size is given and the image is a JPEG, it is decoded at the
+    largest reduction (1/2, 1/4 or 1/8) whose longest side is still at least
+    min_size. factor is how much the result was shrunk, so boxes found on the
+    frame map back to the original image by multiplying by it.
+    """
+    data = np.frombuffer(data, np.uint8) if not isinstance(data, np.ndarray) else data
+    if data.size == 0:
+        # cv2.imdecode raises on an empty buffer instead of returning None
+        return None, 1
+    factor = 1
+    if min_size:
+        dimensions = jpeg_dimensions(data)
+        if dimensions is not None:
+            longest = max(dimensions)
+            factor = next((f for f in REDUCED_FLAGS if longest // f >= min_size), 1)
+    frame = cv2.imdecode(data, REDUCED_FLAGS.get(factor, cv2.IMREAD_COLOR))
+    if frame is None:
+        return None, 1
+    if factor > 1:
+        # libjpeg rounds up, so measure the actual reduction
+        factor = max(dimensions) / max(frame.shape[:2])
+    return frame, factor
+
+
+def decode_raw(stream, width, height, channels=3, pixel_format="bgr", max_bytes=None):
+    """Read raw interleaved uint8 pixels from a stream into an (h, w, c) frame.
+
+    Raises ValueError if the shape is invalid, larger than max_bytes, or the
+    body is shorter than the declared shape. Nothing is allocated before the
+    shape has been checked.
+    """
+    if width < 1 or height < 1 or channels not in (1, 3, 4):
+        raise ValueError("Invalid raw image shape")
+    if max_bytes is not None and width * height * channels > max_bytes:
+        raise ValueError(f"Raw image of {width * height * channels} bytes is larger than {max_bytes} bytes")
+    frame = np.empty((height, width, channels), dtype=np.uint8)
+    view = memoryview(frame.reshape(-1))
+    read = 0
+    while read < frame.size:
+        count = stream.readinto(view[read:])
+        if not count:
+            raise ValueError(f"Expected {frame.size} bytes of pixel data, got {read}")
+        read += count
+
+    if channels == 1:
+        return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+    if channels == 4:
+        return cv2.cvtColor(frame, cv2.COLOR_RGBA2BGR if pixel_format == "rgb" else cv2.COLOR_BGRA2BGR)
+    if pixel_format == "rgb":
+        return frame[:, :, ::-1]
+    return frame
@@ -0,0 +1,26 @@
+import json
+
+
+def format_event(data, event=None, event_id=None):
+    """Format a JSON payload as a Server-Sent Events message."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+def keepalive():
+    """An SSE comment line; keeps proxies from timing out idle streams."""
+    return ": keepalive\n\n"
+
+
+def last_event_id(request, default=0):
+    """Resume cursor from ?since= or the Last-Event-ID header sent on reconnect."""
+    value = request.args.get('since', request.headers.get('Last-Event-ID', default))
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
@@ -0,0 +1,172 @@
+from functools import lru_cache
+import cv2
+from app.config import create_message_frame
+from app.services.capture_service import IMAGE_FORMATS
+from app.services.detection_result import DetectionResult, BINARY_COLUMNS
+from app.utils.sse import format_event
+
+# Frame, stream and detection helpers shared by the Flask blueprints and the
+# ASGI front end. Nothing here blocks except where noted; the callers decide
+# how to wait for the next frame or log entry (a thread or the event loop).
+
+NO_CAPTURE_MESSAGE = "Capture not started. Use POST /start_capture to begin."
+
+
+@lru_cache(maxsize=1)
+def message_jpeg():
+    """The placeholder image served before the first frame is captured."""
+    ret, jpeg = cv2.imencode('.jpg', create_message_frame())
+    if not ret:
+        return None
+    return jpeg.tobytes()
+
+
+def frame_kind(args):
+    # Preview clients get a downscaled copy drawn directly at the smaller size
+    return "preview" if args.get('preview', 'false').lower() == 'true' else "annotated"
+
+
+def parse_frame_options(args, max_dimension):
+    """Parse ?width=&height=&quality=&format= into get_encoded_frame keyword arguments."""
+    fmt = args.get('format', 'jpeg').lower()
+    fmt = 'jpeg' if fmt == 'jpg' else fmt
+    if fmt not in IMAGE_FORMATS:
+        raise ValueError(f"Unknown format: {fmt}. Use one of: {', '.join(IMAGE_FORMATS)}")
+
+    options = {"fmt": fmt}
+    for name, low, high in (('width', 1, max_dimension), ('height', 1, max_dimension), ('quality', 1, 100)):
+        value = args.get(name)
+        if value is not None:
+            try:
+                value = int(value)
+            except ValueError:
+                raise ValueError(f"{name} must be an integer")
+            if not low <= value <= high:
+                raise ValueError(f"{name} must be between {low} and {high}")
+        options[name] = value
+    return options
+
+
+def frame_etag(kind, capture_service, seq, options):
+    variant = "-".join(str(options[name] or "") for name in ('width', 'height', 'fmt', 'quality'))
+    return f"{kind}-{capture_service.stream_id}-{seq}-{variant}"
+
+
+def frame_body(kind, capture_service, encoded, options):
+    """Turn get_encoded_frame's return value into (data, mimetype, etag).
+
+    Before the first frame this is the placeholder JPEG without an etag;
+    data is None when encoding failed.
+    """
+    if encoded is None:
+        return message_jpeg(), 'image/jpeg', None
+    seq, data = encoded
+    return data, IMAGE_FORMATS[options['fmt']][2], frame_etag(kind, capture_service, seq, options)
+
+
+def mjpeg_part(data, content_type):
+    return (b'--frame\r\nContent-Type: ' + content_type + b'\r\n'
+            b'Content-Length: ' + str(len(data)).encode() + b'\r\n\r\n' + data + b'\r\n')
+
+
+class MjpegFeed:
+    """The current multipart part of one MJPEG client.
+
+    Callers encode() (blocking), hand the result to update(), send part()
+    and wait until has_new_frame(); on timeout they send the same part again
+    so dead clients are noticed.
+    """
+
+    def __init__(self, capture_service, kind, options):
+        self.capture_service = capture_service
+        self.kind = kind
+        self.options = options
+        self.seq = 0
+        self.data = message_jpeg()
+        self.content_type = b'image/jpeg'
+
+    def encode(self):
+        return self.capture_service.get_encoded_frame(self.kind, **self.options)
+
+    def update(self, encoded):
+        """Take a frame from encode(); None (nothing captured yet, or skipped) keeps the current part."""
+        if encoded is not None:
+            self.seq, self.data = encoded
+            self.content_type = IMAGE_FORMATS[self.options['fmt']][2].encode()
+
+    def part(self):
+        return mjpeg_part(self.data, self.content_type) if self.data is not None else None
+
+    def has_new_frame(self):
+        return self.capture_service.get_frame_seq() > self.seq
+
+
+class DetectionFeed:
+    """Builds the detection Server-Sent Events of one client, resuming after cursor."""
+
+    def __init__(self, capture_service, cursor):
+        self.capture_service = capture_service
+        self.cursor = cursor
+        self.last_sent = None
+
+    def next_event(self):
+        """The event for the latest detection set, or None if the client already has it."""
+        seq, detections = self.capture_service.get_latest_detection_set()
+        event = None
+        # Consecutive frames often see the same cards; only send when the set changes
+        if seq > self.cursor and detections != self.last_sent:
+            event = format_event({"seq": seq, "detections": detections}, event="detections", event_id=seq)
+            self.last_sent = detections
+        self.cursor = max(self.cursor, seq)
+        return event
+
+    def has_new_frame(self):
+        return self.capture_service.get_frame_seq() > self.cursor
+
+
+class LogFeed:
+    """Builds the log Server-Sent Events of one client, resuming after cursor."""
+
+    def __init__(self, logger, cursor):
+        self.logger = logger
+        self.cursor = cursor
+
+    def next_events(self):
+        """A clear event if the log was cleared, then one event with the new entries."""
+        latest_seq, clear_seq, entries = self.logger.get_logs_since(self.cursor)
+        events = []
+        if clear_seq > self.cursor:
+            events.append(format_event({"seq": clear_seq}, event="clear", event_id=clear_seq))
+        if entries:
+            events.append(format_event(entries, event="logs", event_id=entries[-1]['seq']))
+        self.cursor = latest_seq
+        return events
+
+    def has_new_logs(self):
+        return self.logger.log_seq > self.cursor
+
+
+def serialize_result(result, result_format):
+    """Serialise a DetectionResult as (body, headers).
+
+    body is JSON-ready data for json and columns, and packed float32 rows
+    (bytes) for binary. Raises ValueError for any other format.
+    """
+    if result_format == 'columns':
+        return result.to_columns(), {}
+    if result_format == 'binary':
+        return result.to_bytes(), {
+            'X-Detection-Count': str(len(result)),
+            'X-Detection-Columns': ','.join(BINARY_COLUMNS)
+        }
+    if result_format == 'json':
+        return result.to_records(), {}
+    raise ValueError(f"Unknown format: {result_format}. Use json, columns or binary")
+
+
+def latest_detections(capture_service, result_format):
+    """The latest detections of a capture service as (body, headers), like serialize_result."""
+    if result_format == 'json':
+        return capture_service.get_latest_detections() or [{"message": NO_CAPTURE_MESSAGE}], {}
+    _, _, result = capture_service.get_latest_result()
+    return serialize_result(result if result is not None else DetectionResult.empty(), result_format)
@@ -0,0 +1,10 @@
+"""Offline, CPU-only benchmarks for the inference path and the HTTP API.
+
+    python -m benchmarks micro --output micro.json
+    python -m benchmarks load --duration 10 --concurrency 8 --output load.json
+    python -m benchmarks compare before.json after.json
+
+Without --model, inference runs on StubEngine: the real ONNX engine's
+letterboxing and NumPy post-processing around a canned forward pass, so
+results are reproducible on any machine and need no weights or network.
+"""
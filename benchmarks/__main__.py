@@ -0,0 +1,62 @@
+import argparse
+import json
+import sys
+from benchmarks.common import write_results
+
+
+def compare(before_path, after_path):
+    """Print p50/p95/p99 of two result files side by side with the relative change."""
+    with open(before_path) as f:
+        before = json.load(f)["results"]
+    with open(after_path) as f:
+        after = json.load(f)["results"]
+
+    print(f"{'':28s} {'metric':6s} {'before':>10s} {'after':>10s} {'change':>8s}")
+    for name in before:
+        if name not in after:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            old, new = before[name].get(metric), after[name].get(metric)
+            if old is None or new is None:
+                continue
+            change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+            print(f"{name:28s} {metric[:3]:6s} {old:10.3f} {new:10.3f} {change:>8s}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    micro = commands.add_parser("micro", help="Time decode, inference, post-processing, annotation and encode")
+    micro.add_argument("--iterations", type=int, default=200)
+    micro.add_argument("--model", help="YOLO_MODEL_PATHS entry to run instead of the stub engine")
+    micro.add_argument("--only", nargs="+", help="Run only these cases")
+    micro.add_argument("--output", help="JSON file for the results (default: print)")
+
+    load = commands.add_parser("load", help="Hit /detect, /frame and /logs concurrently")
+    load.add_argument("--url", help="Server to load (default: start one locally with the stub engine)")
+    load.add_argument("--duration", type=float, default=10.0)
+    load.add_argument("--concurrency", type=int, default=8)
+    load.add_argument("--endpoints", nargs="+", default=["detect", "frame", "logs"],
+                      choices=["detect", "frame", "logs"])
+    load.add_argument("--model", help="YOLO_MODEL_PATHS entry for the local server instead of the stub engine")
+    load.add_argument("--output", help="JSON file for the results (default: print)")
+
+    diff = commands.add_parser("compare", help="Compare two result files")
+    diff.add_argument("before")
+    diff.add_argument("after")
+
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        compare(args.before, args.after)
+    elif args.command == "micro":
+        from benchmarks import micro as micro_benchmarks
+        write_results(micro_benchmarks.run(args.iterations, args.model, args.only), args.output)
+    else:
+        from benchmarks import load as load_benchmarks
+        write_results(load_benchmarks.run(args.url, args.duration, args.concurrency, tuple(args.endpoints), args.model),
+                      args.output)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,111 @@
+import json
+import os
+import platform
+import time
+import cv2
+import numpy as np
+from app.config import CUSTOM_CLASS_NAMES
+from app.services.engines import OnnxEngine
+
+
+class _StubSession:
+    """Answers OnnxEngine's session.run with the same prediction for every image."""
+
+    def __init__(self, prediction):
+        self.prediction = prediction
+
+    def run(self, outputs, feeds):
+        batch = next(iter(feeds.values()))
+        return [np.repeat(self.prediction[None], len(batch), axis=0)]
+
+
+class StubEngine(OnnxEngine):
+    """OnnxEngine with a canned forward pass instead of an ONNX Runtime session.
+
+    The (4 + classes, anchors) prediction mimics a YOLOv8/11 head: mostly
+    low-scoring background plus a few confident boxes, so pre- and
+    post-processing cost what they do for a real model.
+    """
+
+    name = "stub"
+
+    def __init__(self, imgsz=640, detections=8, anchors=8400, iou=0.45, seed=0):
+        rng = np.random.default_rng(seed)
+        num_classes = len(CUSTOM_CLASS_NAMES)
+        prediction = np.empty((4 + num_classes, anchors), dtype=np.float32)
+        prediction[:2] = rng.uniform(0, imgsz, (2, anchors))
+        prediction[2:4] = rng.uniform(20, 120, (2, anchors))
+        prediction[4:] = rng.uniform(0, 0.05, (num_classes, anchors))
+        hits = rng.choice(anchors, detections, replace=False)
+        prediction[4 + rng.integers(0, num_classes, detections), hits] = rng.uniform(0.5, 0.95, detections)
+
+        self.session = _StubSession(prediction)
+        self.input_name = "images"
+        self.dynamic_batch = True
+        self.input_size = (imgsz, imgsz)
+        self.iou = iou
+
+
+def load_engine(model_name=None):
+    """The engine for a YOLO_MODEL_PATHS entry, or StubEngine when model_name is None."""
+    if model_name is None:
+        return StubEngine()
+    from app.services.engines import create_engine
+    engine = create_engine(model_name)
+    engine.warmup()
+    return engine
+
+
+def time_calls(function, iterations, warmup=5):
+    """Call function warmup + iterations times and return the timed durations in seconds."""
+    for _ in range(warmup):
+        function()
+    durations = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def summarize(durations, elapsed=None):
+    """Latency percentiles in ms, plus throughput over elapsed seconds (default: the summed durations)."""
+    if not durations:
+        return {"count": 0}
+    ms = np.asarray(durations) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    elapsed = elapsed if elapsed is not None else float(ms.sum()) / 1000
+    return {
+        "count": len(durations),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "min_ms": round(float(ms.min()), 3),
+        "max_ms": round(float(ms.max()), 3),
+        "per_second": round(len(durations) / elapsed, 2) if elapsed else None
+    }
+
+
+def environment():
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "opencv_threads": cv2.getNumThreads()
+    }
+
+
+def write_results(report, path=None):
+    """Write the report as JSON to path, or print it when path is None."""
+    text = json.dumps(report, indent=2)
+    if path is None:
+        print(text)
+        return
+    with open(path, 'w') as f:
+        f.write(text + "\n")
+    print(f"Wrote {path}")
@@ -0,0 +1,114 @@
+"""Concurrent load against /detect, /frame and /logs, reporting latency percentiles and throughput."""
+
+import threading
+import time
+import cv2
+import requests
+from werkzeug.serving import WSGIRequestHandler, make_server
+from app.config import Config, create_fake_image
+from benchmarks.common import environment, load_engine, summarize
+
+ENDPOINTS = ("detect", "frame", "logs")
+
+
+class BenchmarkConfig(Config):
+    SIMULATION_MODE = True  # The stub (or --model) engine is swapped in after startup
+    DEBUG = False
+    CAPTURE_TARGET_FPS = 30
+    RESULT_CACHE_SIZE = 0  # Every upload runs the model
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def start_local_server(model_name=None):
+    """Serve the app on an ephemeral localhost port with capture running. Returns (server, url)."""
+    from app import create_app, get_capture_service, get_detection_service
+
+    app = create_app(BenchmarkConfig)
+    detection_service = get_detection_service()
+    detection_service.simulation_mode = False
+    detection_service.model = load_engine(model_name)
+    get_capture_service().start_capture()
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=_QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def _requests(url, image):
+    return {
+        "detect": lambda session: session.post(f"{url}/detect", files={"image": ("frame.jpg", image, "image/jpeg")}),
+        "frame": lambda session: session.get(f"{url}/frame"),
+        "logs": lambda session: session.get(f"{url}/logs"),
+    }
+
+
+def _worker(name, send, deadline, samples, errors, lock):
+    session = requests.Session()
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            response = send(session)
+            failed = response.status_code >= 400
+        except requests.RequestException:
+            failed = True
+        elapsed = time.perf_counter() - started
+        with lock:
+            samples[name].append(elapsed)
+            if failed:
+                errors[name] += 1
+
+
+def run(url=None, duration=10.0, concurrency=8, endpoints=ENDPOINTS, model_name=None):
+    """Run concurrency clients for duration seconds against url, or a local server if url is None."""
+    server = None
+    if url is None:
+        server, url = start_local_server(model_name)
+        # Let capture publish a first frame so /frame measures real frames
+        time.sleep(0.5)
+
+    image = cv2.imencode('.jpg', create_fake_image())[1].tobytes()
+    by_name = _requests(url, image)
+    samples = {name: [] for name in endpoints}
+    errors = {name: 0 for name in endpoints}
+    lock = threading.Lock()
+
+    started = time.monotonic()
+    deadline = started + duration
+    threads = []
+    for i in range(concurrency):
+        # Clients are spread over the endpoints and each keeps one request in flight
+        name = endpoints[i % len(endpoints)]
+        threads.append(threading.Thread(target=_worker, args=(name, by_name[name], deadline, samples, errors, lock)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    if server is not None:
+        server.shutdown()
+
+    results = {}
+    for name in endpoints:
+        results[name] = dict(summarize(samples[name], elapsed), errors=errors[name])
+        print(f"{name:8s} {results[name]['count']:6d} req  {results[name].get('per_second', 0):8.1f} req/s  "
+              f"p50 {results[name].get('p50_ms', 0):8.2f} ms  p95 {results[name].get('p95_ms', 0):8.2f} ms  "
+              f"p99 {results[name].get('p99_ms', 0):8.2f} ms  errors {errors[name]}")
+    all_samples = [duration for name in endpoints for duration in samples[name]]
+    results["all"] = dict(summarize(all_samples, elapsed), errors=sum(errors.values()))
+    return {
+        "benchmark": "load",
+        "environment": environment(),
+        "config": {
+            "url": url if server is None else "local",
+            "duration": duration,
+            "concurrency": concurrency,
+            "endpoints": list(endpoints),
+            "model": model_name or "stub"
+        },
+        "results": results
+    }
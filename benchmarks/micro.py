@@ -0,0 +1,55 @@
+"""Micro-benchmarks of the per-frame work: fake frames, decode, inference, post-processing, annotation, encode."""
+
+import cv2
+import numpy as np
+from app.config import create_fake_image
+from app.services.detection_service import DetectionService
+from app.services.engines import letterbox, postprocess, to_tensor
+from app.utils.image_decode import decode_image
+from benchmarks.common import StubEngine, environment, load_engine, summarize, time_calls
+
+
+def cases(model_name=None, batch_size=8):
+    """(name, function) pairs, each doing one unit of work on a 1200x640 frame."""
+    frame = create_fake_image()
+    jpeg = cv2.imencode('.jpg', frame)[1].tobytes()
+    large_jpeg = cv2.imencode('.jpg', cv2.resize(frame, None, fx=3, fy=3))[1].tobytes()
+
+    detection_service = DetectionService(simulation_mode=True, model_name=model_name)
+    detection_service.simulation_mode = False
+    detection_service.model = load_engine(model_name)
+    _, results = detection_service.detect_with_results(frame, block=True)
+
+    stub = StubEngine()
+    letterboxed, scale, pad = letterbox(frame, stub.input_size)
+    prediction = stub.session.prediction
+
+    return [
+        ("create_fake_image", create_fake_image),
+        ("imencode_jpeg", lambda: cv2.imencode('.jpg', frame)),
+        ("imdecode_jpeg", lambda: cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)),
+        ("decode_large_jpeg", lambda: decode_image(large_jpeg)),
+        ("decode_large_jpeg_reduced", lambda: decode_image(large_jpeg, min_size=detection_service.get_input_size())),
+        ("preprocess", lambda: to_tensor(letterbox(frame, stub.input_size)[0])),
+        ("postprocess", lambda: postprocess(prediction, 0.3, stub.iou, scale, pad, frame.shape[:2])),
+        ("inference", lambda: detection_service.detect_with_results(frame, block=True)),
+        (f"inference_batch_{batch_size}", lambda: detection_service.detect_batch_results([frame] * batch_size,
+                                                                                          block=True)),
+        ("annotate", lambda: detection_service.annotate_frame(frame, results=results)),
+        ("annotate_preview", lambda: detection_service.annotate_frame(frame, results=results, scale=0.5)),
+    ]
+
+
+def run(iterations=200, model_name=None, only=None):
+    results = {}
+    for name, function in cases(model_name):
+        if only and name not in only:
+            continue
+        results[name] = summarize(time_calls(function, iterations))
+        print(f"{name:28s} p50 {results[name]['p50_ms']:9.3f} ms   p99 {results[name]['p99_ms']:9.3f} ms")
+    return {
+        "benchmark": "micro",
+        "environment": environment(),
+        "config": {"iterations": iterations, "model": model_name or "stub"},
+        "results": results
+    }
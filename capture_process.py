@@ -0,0 +1,40 @@
+"""Capture and inference process for multi-worker deployments.
+
+Runs every capture source once and publishes frames and detections into
+shared memory. Web workers started with FRAME_BUS_ROLE = "reader" serve from
+there, so they can scale across cores without opening the camera or
+disagreeing about the latest frame:
+
+    python capture_process.py &
+    gunicorn -w 4 wsgi:app    # with FRAME_BUS_ROLE = "reader" in Config
+"""
+
+import signal
+import threading
+from app import create_app, get_capture_services
+from app.config import Config
+
+
+class CaptureProcessConfig(Config):
+    FRAME_BUS_ROLE = "writer"
+
+
+def main():
+    create_app(CaptureProcessConfig)
+    services = get_capture_services()
+    for service in services.values():
+        service.start_capture()
+    print(f"Publishing {', '.join(services)} to shared memory")
+    
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stopped.set())
+    signal.signal(signal.SIGINT, lambda *args: stopped.set())
+    stopped.wait()
+    
+    for service in services.values():
+        service.stop_capture()
+        service.frame_bus.close()
+
+
+if __name__ == '__main__':
+    main()
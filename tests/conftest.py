@@ -0,0 +1,27 @@
+"""
+Shared fixtures for the test suite.
+"""
+
+import numpy as np
+import pytest
+
+
+class FakeModel:
+    """Stands in for an inference engine and counts forward passes."""
+
+    timings = {}
+
+    def __init__(self, rows=None):
+        self.rows = rows if rows is not None else [[10, 20, 110, 220, 0.9, 0]]
+        self.calls = 0
+        self.batch_sizes = []
+
+    def infer(self, frames, conf=0.3):
+        self.calls += 1
+        self.batch_sizes.append(len(frames))
+        return [np.array(self.rows, dtype=np.float32).reshape(-1, 6) for _ in frames]
+
+
+@pytest.fixture
+def fake_model():
+    return FakeModel()
@@ -6,14 +6,18 @@ Run with: pytest
 
 import pytest
 from app import create_app
+from app.config import Config
+
+
+class SimulationConfig(Config):
+    SIMULATION_MODE = True  # No model load or camera at startup
 
 
 @pytest.fixture
 def app():
     """Create and configure a test app instance."""
-    app = create_app()
+    app = create_app(SimulationConfig)
     app.config['TESTING'] = True
-    app.config['SIMULATION_MODE'] = True
     yield app
 
 
@@ -33,6 +37,29 @@ def test_health_endpoint(client):
     assert 'simulation_mode' in data
 
 
+def test_readiness_waits_for_model_and_liveness_does_not(client, fake_model):
+    from app import get_detection_service
+    
+    assert client.get('/health/live').status_code == 200
+    assert client.get('/health/ready').status_code == 200
+    
+    detection_service = get_detection_service()
+    detection_service.simulation_mode = False
+    response = client.get('/health/ready')
+    assert response.status_code == 503
+    assert response.get_json()["checks"]["model"] == "loading"
+    assert client.get('/health').get_json()["ready"] is False
+    
+    # Inference before the model is active is refused rather than failing
+    response = client.post('/detect', data={'image': _jpeg_file('frame.jpg')}, content_type='multipart/form-data')
+    assert response.status_code == 503
+    
+    detection_service.model = fake_model
+    assert client.get('/health/ready').get_json() == {
+        "status": "ready", "checks": {"model": "ready", "sources": {"default": "ready"}}
+    }
+
+
 def test_info_page(client):
     """Test that the info page loads."""
     response = client.get('/info')
@@ -56,4 +83,373 @@ def test_model_endpoint(client):
     assert 'available_models' in data
 
 
+def test_unprocessed_frame_without_capture_returns_message(client):
+    """Test that a message image is served before capture has started."""
+    response = client.get('/unprocessed_frame')
+    assert response.status_code == 200
+    assert response.mimetype == 'image/jpeg'
+    assert 'ETag' not in response.headers
+
+
+def test_unprocessed_frame_etag_returns_304(client):
+    """Test that a client holding the current frame gets a 304."""
+    from app import get_capture_service
+    from app.config import create_fake_image
+    
+    capture_service = get_capture_service()
+    capture_service._publish(create_fake_image(), [], None)
+    
+    response = client.get('/unprocessed_frame')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    
+    response = client.get('/unprocessed_frame', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    
+    capture_service._publish(create_fake_image(), [], None)
+    response = client.get('/unprocessed_frame', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_unprocessed_stream_pushes_latest_frame(client):
+    """Test that the MJPEG stream sends multipart JPEG parts."""
+    from app import get_capture_service
+    from app.config import create_fake_image
+    
+    get_capture_service()._publish(create_fake_image(), [], None)
+    
+    response = client.get('/unprocessed_stream', buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == 'multipart/x-mixed-replace'
+    part = next(iter(response.response))
+    assert part.startswith(b'--frame\r\nContent-Type: image/jpeg\r\n')
+    response.close()
+
+
+def test_logs_stream_sends_only_new_entries(client):
+    """Test that the log stream resumes from the given cursor."""
+    from app import get_logger
+    from app.services.logger_service import LogLevel
+    
+    logger = get_logger()
+    logger.log(LogLevel.INFO, "old entry")
+    logger.log(LogLevel.INFO, "new entry")
+    
+    response = client.get('/logs/stream?since=1', buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    event = next(iter(response.response)).decode()
+    response.close()
+    assert event.startswith('id: 2\nevent: logs\n')
+    assert 'new entry' in event
+    assert 'old entry' not in event
+
+
+def test_detections_stream_pushes_new_detection_set(client):
+    """Test that the detection stream sends the latest detection set."""
+    from app import get_capture_service
+    from app.config import create_fake_image
+    
+    detections = [{"class_name": "AS", "confidence": 0.9}]
+    get_capture_service()._publish(create_fake_image(), detections, None)
+    
+    response = client.get('/detections/stream', buffered=False)
+    event = next(iter(response.response)).decode()
+    response.close()
+    assert 'event: detections' in event
+    assert '"class_name":"AS"' in event
+
+
+def test_logs_since_returns_incremental_page(client):
+    """Test cursor-based incremental reads from GET /logs."""
+    for message in ["one", "two", "three"]:
+        client.post('/logs', json={"level": "INFO", "message": message})
+    
+    data = client.get('/logs?since=0&limit=2').get_json()
+    assert [entry['message'] for entry in data['logs']] == ["one", "two"]
+    
+    data = client.get(f"/logs?since={data['cursor']}").get_json()
+    assert [entry['message'] for entry in data['logs']] == ["three"]
+    assert data['cursor'] == data['latest_seq']
+
+
+def _jpeg_file(name):
+    import io
+    import cv2
+    from app.config import create_fake_image
+    
+    ret, jpeg = cv2.imencode('.jpg', create_fake_image())
+    return io.BytesIO(jpeg.tobytes()), name
+
+
+def test_detect_batch_streams_results_in_input_order(client, fake_model):
+    """Test that batch detection runs model batches and keeps input order."""
+    import io
+    from app import get_detection_service
+    
+    detection_service = get_detection_service()
+    detection_service.simulation_mode = False
+    detection_service.model = fake_model
+    
+    images = [_jpeg_file('a.jpg'), (io.BytesIO(b'not an image'), 'bad.jpg'), _jpeg_file('b.jpg'), _jpeg_file('c.jpg')]
+    response = client.post('/detect/batch?batch_size=2', data={'images': images},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    
+    results = response.get_json()
+    assert [result['name'] for result in results] == ['a.jpg', 'bad.jpg', 'b.jpg', 'c.jpg']
+    assert results[1]['error'] == 'Could not decode image'
+    assert results[3]['detections'][0]['class_name'] == 'TC'
+    assert fake_model.batch_sizes == [1, 2]
+
+
+def test_detect_batch_accepts_zip_as_ndjson(client):
+    """Test that a zip archive is expanded and results are streamed as NDJSON."""
+    import io
+    import json
+    import zipfile
+    
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zf:
+        for name in ['x.jpg', 'y.jpg']:
+            zf.writestr(name, _jpeg_file(name)[0].getvalue())
+    
+    response = client.post('/detect/batch?format=ndjson', data=archive.getvalue(),
+                           content_type='application/zip')
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert [line['name'] for line in lines] == ['x.jpg', 'y.jpg']
+
+
+def test_detect_batch_rejects_batch_size_above_scheduler_limit(app, client):
+    """Test that ?batch_size= cannot exceed the scheduler's max batch size."""
+    app.config['INFERENCE_MAX_BATCH'] = 4
+    response = client.post('/detect/batch?batch_size=5', data={'images': [_jpeg_file('a.jpg')]},
+                           content_type='multipart/form-data')
+    assert response.status_code == 400
+    assert "at most 4" in response.get_json()['error']
+
+
+def test_detect_batch_reports_empty_file_and_keeps_streaming(client):
+    """Test that an empty upload is reported per item instead of cutting the batch short."""
+    import io
+    
+    images = [(io.BytesIO(b''), 'empty.jpg'), _jpeg_file('a.jpg')]
+    response = client.post('/detect/batch', data={'images': images}, content_type='multipart/form-data')
+    assert response.status_code == 200
+    
+    results = response.get_json()
+    assert results[0]['name'] == 'empty.jpg'
+    assert results[0]['error'] == 'Could not decode image'
+    assert results[1]['name'] == 'a.jpg'
+
+
+def test_detect_batch_rejects_oversized_zip_before_extracting(app, client):
+    """Test that zip member count and declared sizes are checked before reading members."""
+    import io
+    import zipfile
+    
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('huge.bin', b'\0' * 1024 * 1024)
+    app.config['BATCH_MAX_UNPACKED_SIZE'] = 1024
+    response = client.post('/detect/batch', data=archive.getvalue(), content_type='application/zip')
+    assert response.status_code == 413
+    
+    app.config['BATCH_MAX_UNPACKED_SIZE'] = 10 * 1024 * 1024
+    app.config['BATCH_MAX_IMAGES'] = 0
+    response = client.post('/detect/batch', data=archive.getvalue(), content_type='application/zip')
+    assert response.status_code == 413
+    
+    app.config['MAX_UPLOAD_SIZE'] = 16
+    response = client.post('/detect/batch', data=archive.getvalue(), content_type='application/zip')
+    assert response.status_code == 413
+
+
+def test_detect_returns_503_when_inference_queue_full(client, monkeypatch):
+    """Test that a saturated inference scheduler rejects instead of queueing."""
+    from app import get_detection_service
+    from app.services.inference_scheduler import QueueFullError
+    
+    detection_service = get_detection_service()
+    detection_service.simulation_mode = False
+    
+    def full(*args, **kwargs):
+        raise QueueFullError("Inference queue is full")
+    
+    monkeypatch.setattr(detection_service.scheduler, 'submit', full)
+    response = client.post('/detect', data={'image': _jpeg_file('a.jpg')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+
+def test_frame_endpoints_select_source(tmp_path):
+    """Test that each configured source keeps its own frame state."""
+    import cv2
+    from app import get_capture_service
+    from app.config import Config, create_fake_image
+    
+    cv2.imwrite(str(tmp_path / 'card.jpg'), create_fake_image())
+    
+    class MultiSourceConfig(Config):
+        SIMULATION_MODE = True
+        CAPTURE_SOURCES = {
+            "default": {"type": "fake"},
+            "table2": {"type": "images", "path": str(tmp_path)},
+        }
+    
+    client = create_app(MultiSourceConfig).test_client()
+    
+    table2 = get_capture_service('table2')
+    table2._publish(table2.camera.capture(), [{"class_name": "KH", "confidence": 0.8}], None)
+    
+    assert client.get('/detections?source=table2').get_json()[0]['class_name'] == 'KH'
+    assert 'message' in client.get('/detections').get_json()[0]
+    assert client.get('/unprocessed_frame?source=table2').headers.get('ETag') is not None
+    assert client.get('/detections?source=missing').status_code == 404
+    
+    sources = client.get('/sources').get_json()['sources']
+    assert [source['id'] for source in sources] == ['default', 'table2']
+
+
+def test_detect_supports_columnar_and_binary_formats(client, fake_model):
+    """Test the compact result formats for POST /detect."""
+    from app import get_detection_service
+    
+    detection_service = get_detection_service()
+    detection_service.simulation_mode = False
+    detection_service.model = fake_model
+    
+    response = client.post('/detect?format=columns', data={'image': _jpeg_file('a.jpg')},
+                           content_type='multipart/form-data')
+    data = response.get_json()
+    assert data['class_name'] == ['TC']
+    assert data['box'] == [[10, 20, 110, 220]]
+    
+    response = client.post('/detect?format=binary', data={'image': _jpeg_file('a.jpg')},
+                           content_type='multipart/form-data')
+    assert response.mimetype == 'application/octet-stream'
+    assert response.headers['X-Detection-Count'] == '1'
+    assert len(response.data) == 6 * 4
+
+
+def test_frame_preview_is_downscaled(client):
+    """Test that ?preview=true serves a smaller annotated frame."""
+    import cv2
+    import numpy as np
+    from app import get_capture_service, get_detection_service
+    from app.config import create_fake_image, IMAGE_WIDTH
+    from app.services.detection_result import DetectionResult
+    
+    get_detection_service().simulation_mode = False
+    result = DetectionResult.from_array([[10, 20, 110, 220, 0.9, 0]])
+    get_capture_service()._publish(create_fake_image(), result.to_records(), result)
+    
+    response = client.get('/frame?preview=true')
+    image = cv2.imdecode(np.frombuffer(response.data, np.uint8), cv2.IMREAD_COLOR)
+    assert image.shape[1] == IMAGE_WIDTH // 2
+    assert response.headers['ETag'].startswith('"preview-')
+
+
+def test_unprocessed_frame_resizes_and_changes_format(client):
+    """Test width/format negotiation and the size guard on frame endpoints."""
+    import cv2
+    import numpy as np
+    from app import get_capture_service
+    from app.config import create_fake_image, IMAGE_WIDTH, IMAGE_HEIGHT
+    
+    get_capture_service()._publish(create_fake_image(), [], None)
+    
+    response = client.get('/unprocessed_frame?width=300&format=png')
+    assert response.mimetype == 'image/png'
+    image = cv2.imdecode(np.frombuffer(response.data, np.uint8), cv2.IMREAD_COLOR)
+    assert image.shape[:2] == (IMAGE_HEIGHT * 300 // IMAGE_WIDTH, 300)
+    
+    # Never upscales past the captured size
+    response = client.get(f'/unprocessed_frame?width={IMAGE_WIDTH * 2}&format=webp&quality=50')
+    assert response.mimetype == 'image/webp'
+    image = cv2.imdecode(np.frombuffer(response.data, np.uint8), cv2.IMREAD_COLOR)
+    assert image.shape[1] == IMAGE_WIDTH
+    
+    assert client.get('/unprocessed_frame?quality=101').status_code == 400
+    assert client.get('/unprocessed_frame?width=100000').status_code == 400
+    assert client.get('/unprocessed_frame?format=gif').status_code == 400
+
+
+def test_detect_accepts_raw_pixels_and_scales_reduced_decodes(client, app, fake_model):
+    """Test raw octet-stream uploads, reduced JPEG decodes and the upload size limit."""
+    import io
+    import cv2
+    import numpy as np
+    from app import get_detection_service
+    
+    detection_service = get_detection_service()
+    detection_service.simulation_mode = False
+    detection_service.model = fake_model
+    
+    pixels = np.zeros((48, 64, 3), dtype=np.uint8)
+    response = client.post('/detect', data=pixels.tobytes(), content_type='application/octet-stream',
+                           headers={'X-Image-Width': '64', 'X-Image-Height': '48'})
+    assert response.status_code == 200
+    assert response.get_json()[0]['box'] == [10, 20, 110, 220]
+    
+    response = client.post('/detect', data=b'\x00' * 10, content_type='application/octet-stream',
+                           headers={'X-Image-Width': '64', 'X-Image-Height': '48'})
+    assert response.status_code == 400
+    
+    # Declared shapes are checked before anything is allocated
+    response = client.post('/detect', data=b'\x00' * 10, content_type='application/octet-stream',
+                           headers={'X-Image-Width': '100000', 'X-Image-Height': '100000'})
+    assert response.status_code == 413
+    response = client.post('/detect', data=b'', content_type='application/octet-stream',
+                           headers={'X-Image-Width': '-64', 'X-Image-Height': '48'})
+    assert response.status_code == 400
+    
+    # 2560 wide decodes at 1/4 size; boxes come back in full-size pixels
+    ret, jpeg = cv2.imencode('.jpg', np.zeros((1440, 2560, 3), dtype=np.uint8))
+    response = client.post('/detect', data={'image': (io.BytesIO(jpeg.tobytes()), 'big.jpg')},
+                           content_type='multipart/form-data')
+    assert response.get_json()[0]['box'] == [40, 80, 440, 880]
+    
+    app.config['MAX_UPLOAD_SIZE'] = 1024
+    response = client.post('/detect', data={'image': _jpeg_file('a.jpg')}, content_type='multipart/form-data')
+    assert response.status_code == 413
+
+
+def test_detect_caches_identical_uploads_until_model_changes(client, fake_model):
+    """Test that resubmitted images are served from the result cache."""
+    import io
+    from app import get_detection_service
+    
+    detection_service = get_detection_service()
+    detection_service.simulation_mode = False
+    detection_service.model = fake_model
+    
+    image, name = _jpeg_file('a.jpg')
+    data = image.getvalue()
+    for _ in range(3):
+        response = client.post('/detect', data={'image': (io.BytesIO(data), name)}, content_type='multipart/form-data')
+        assert response.get_json()[0]['class_name'] == 'TC'
+    assert fake_model.calls == 1
+    
+    stats = client.get('/detect/cache').get_json()
+    assert (stats['hits'], stats['misses']) == (2, 1)
+    
+    detection_service._set_model('other', fake_model)
+    client.post('/detect', data={'image': (io.BytesIO(data), name)}, content_type='multipart/form-data')
+    assert fake_model.calls == 2
+
+
+def test_metrics_endpoint_reports_request_latency(client):
+    client.get('/health')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
+    body = response.get_data(as_text=True)
+    assert '# TYPE yolo_http_request_seconds histogram' in body
+    assert 'yolo_http_request_seconds_count{endpoint="main.health",method="GET",status="200"}' in body
+    assert 'yolo_inference_queue_depth 0' in body
+
+
 # Add more tests as needed
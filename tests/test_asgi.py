@@ -0,0 +1,151 @@
+"""
+Tests for the ASGI entry point, driven directly through the ASGI protocol.
+"""
+
+import asyncio
+import json
+import threading
+import pytest
+from app.asgi import create_asgi_app
+from app.config import Config
+
+
+class SimulationConfig(Config):
+    SIMULATION_MODE = True
+
+
+@pytest.fixture
+def asgi_app():
+    app = create_asgi_app(SimulationConfig)
+    # The app binds to the loop of its first request, as under a real server
+    app.test_loop = asyncio.new_event_loop()
+    yield app
+    app.test_loop.close()
+
+
+def _request(app, path, query=b'', method='GET', headers=(), body=b'', until=None, timeout=5.0):
+    """Run one request; with until, disconnect once until(messages) is true. Returns the sent messages."""
+    messages = []
+    
+    async def run():
+        sent = asyncio.Event()
+        
+        async def receive():
+            if until is None:
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+            while not until(messages):
+                sent.clear()
+                await sent.wait()
+            return {'type': 'http.disconnect'}
+        
+        async def send(message):
+            messages.append(message)
+            sent.set()
+        
+        scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query, 'headers': list(headers),
+                 'http_version': '1.1', 'scheme': 'http', 'server': ('testserver', 80), 'client': ('127.0.0.1', 1)}
+        await asyncio.wait_for(app(scope, receive, send), timeout)
+    
+    app.test_loop.run_until_complete(run())
+    return messages
+
+
+def _status(messages):
+    return messages[0]['status']
+
+
+def _headers(messages):
+    return dict(messages[0]['headers'])
+
+
+def _body(messages):
+    return b''.join(message.get('body', b'') for message in messages[1:])
+
+
+def test_asgi_frame_serves_etag_and_304(asgi_app):
+    from app import get_capture_service
+    from app.config import create_fake_image
+    
+    get_capture_service()._publish(create_fake_image(), [], None)
+    
+    messages = _request(asgi_app, '/unprocessed_frame')
+    assert _status(messages) == 200
+    assert _headers(messages)[b'content-type'] == b'image/jpeg'
+    etag = _headers(messages)[b'etag']
+    
+    messages = _request(asgi_app, '/unprocessed_frame', headers=[(b'if-none-match', etag)])
+    assert _status(messages) == 304
+    
+    assert _status(_request(asgi_app, '/unprocessed_frame', query=b'quality=0')) == 400
+    assert _status(_request(asgi_app, '/frame', query=b'source=missing')) == 404
+
+
+def test_asgi_detection_stream_wakes_on_publish(asgi_app):
+    from app import get_capture_service
+    from app.config import create_fake_image
+    
+    capture_service = get_capture_service()
+    publisher = threading.Timer(0.1, capture_service._publish,
+                                args=(create_fake_image(), [{"class_name": "AS", "confidence": 0.9}], None))
+    publisher.start()
+    
+    messages = _request(asgi_app, '/detections/stream', until=lambda sent: b'event: detections' in _body(sent))
+    publisher.join()
+    assert _headers(messages)[b'content-type'] == b'text/event-stream'
+    assert b'"class_name":"AS"' in _body(messages)
+
+
+def test_asgi_falls_back_to_flask_and_applies_backpressure(asgi_app):
+    messages = _request(asgi_app, '/health')
+    assert _status(messages) == 200
+    assert json.loads(_body(messages))
+    
+    asgi_app.max_pending = 0
+    messages = _request(asgi_app, '/health')
+    assert _status(messages) == 503
+    assert _headers(messages)[b'retry-after'] == b'1'
+
+
+def test_asgi_timed_out_jobs_hold_their_slot_until_they_finish(asgi_app):
+    import time
+    from app.asgi import BusyError
+    
+    release = threading.Event()
+    asgi_app.max_pending = 1
+    asgi_app.request_timeout = 0.05
+    
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await asgi_app.run(release.wait, 5)
+        # The timed-out job is still running on its worker thread
+        with pytest.raises(BusyError):
+            await asgi_app.run(release.wait, 5)
+    
+    asgi_app.test_loop.run_until_complete(scenario())
+    assert asgi_app.pending == 1
+    release.set()
+    deadline = time.monotonic() + 2
+    while asgi_app.pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert asgi_app.pending == 0
+
+
+def test_asgi_streams_batch_detection_from_flask(asgi_app):
+    import io
+    import zipfile
+    import cv2
+    from app.config import create_fake_image
+    
+    _, jpeg = cv2.imencode('.jpg', create_fake_image())
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zf:
+        for index in range(6):
+            zf.writestr(f"{index}.jpg", jpeg.tobytes())
+    
+    # Chunks land on different executor threads; the Flask context must survive that
+    for _ in range(10):
+        messages = _request(asgi_app, '/detect/batch', query=b'batch_size=2', method='POST',
+                            headers=[(b'content-type', b'application/zip')], body=archive.getvalue())
+        assert _status(messages) == 200
+        assert messages[-1] == {'type': 'http.response.body', 'body': b''}
+        assert [item['name'] for item in json.loads(_body(messages))] == [f"{index}.jpg" for index in range(6)]
@@ -0,0 +1,37 @@
+"""
+Smoke tests for the benchmark package.
+
+Run with: pytest
+"""
+
+import json
+import numpy as np
+import pytest
+from benchmarks.__main__ import main
+from benchmarks.common import StubEngine, summarize
+
+
+def test_stub_engine_runs_real_pre_and_post_processing():
+    engine = StubEngine(detections=5)
+    boxes = engine.infer([np.zeros((640, 1200, 3), dtype=np.uint8)] * 2)
+    assert len(boxes) == 2 and 0 < len(boxes[0]) <= 5
+    assert set(engine.timings) == {"preprocess", "inference", "postprocess"}
+
+
+def test_summarize_reports_percentiles_and_throughput():
+    summary = summarize([0.001 * n for n in range(1, 101)], elapsed=2.0)
+    assert summary["count"] == 100
+    assert summary["p50_ms"] == pytest.approx(50.5)
+    assert summary["p99_ms"] == pytest.approx(99.01)
+    assert summary["per_second"] == 50.0
+
+
+def test_micro_benchmarks_write_comparable_json(tmp_path, capsys):
+    output = tmp_path / "micro.json"
+    main(["micro", "--iterations", "2", "--only", "postprocess", "annotate", "--output", str(output)])
+    report = json.loads(output.read_text())
+    assert report["config"]["model"] == "stub"
+    assert set(report["results"]) == {"postprocess", "annotate"}
+    
+    main(["compare", str(output), str(output)])
+    assert "+0.0%" in capsys.readouterr().out
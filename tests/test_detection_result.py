@@ -0,0 +1,44 @@
+"""
+Unit tests for the NumPy-backed DetectionResult.
+
+Run with: pytest
+"""
+
+import numpy as np
+import pytest
+from app.services.detection_result import DetectionResult
+
+
+@pytest.fixture
+def result():
+    return DetectionResult.from_array([
+        [10, 20, 30, 40, 0.9, 0],
+        [50, 60, 70, 80, 0.5, 39],
+        [1, 2, 3, 4, 0.4, 99],
+    ])
+
+
+def test_class_names_use_lookup_table_with_fallback(result):
+    assert result.class_names.tolist() == ["TC", "AS", "class_99"]
+
+
+def test_records_include_boxes(result):
+    records = result.to_records()
+    assert records[1] == {"class_name": "AS", "confidence": pytest.approx(0.5), "box": [50, 60, 70, 80]}
+    assert "box" not in result.to_records(include_boxes=False)[0]
+
+
+def test_columns_and_binary_round_trip(result):
+    columns = result.to_columns()
+    assert columns["count"] == 3
+    assert columns["class_id"] == [0, 39, 99]
+    
+    restored = DetectionResult.from_bytes(result.to_bytes())
+    np.testing.assert_array_equal(restored.to_array(), result.to_array())
+
+
+def test_empty_result_serialises():
+    empty = DetectionResult.empty()
+    assert len(empty) == 0
+    assert empty.to_records() == []
+    assert empty.to_columns()["box"] == []
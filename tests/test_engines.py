@@ -0,0 +1,40 @@
+"""
+Unit tests for the inference engines' NumPy pre/post-processing.
+
+Run with: pytest
+"""
+
+import numpy as np
+import pytest
+from app.services.engines import create_engine, letterbox, nms, postprocess
+
+
+def test_letterbox_keeps_aspect_ratio_and_pads():
+    frame = np.zeros((640, 1200, 3), dtype=np.uint8)
+    image, scale, pad = letterbox(frame, (640, 640))
+    assert image.shape == (640, 640, 3)
+    assert scale == pytest.approx(640 / 1200)
+    assert pad == (0, 149)
+
+
+def test_nms_suppresses_overlaps_within_class_only():
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 10, 10], [0, 0, 10, 10]], dtype=np.float32)
+    scores = np.array([0.9, 0.8, 0.7], dtype=np.float32)
+    assert nms(boxes, scores, 0.5).tolist() == [0]
+    assert nms(boxes, scores, 0.5, class_ids=np.array([0, 0, 1])).tolist() == [0, 2]
+
+
+def test_postprocess_maps_boxes_back_to_frame():
+    # Two anchors, two classes: (cx, cy, w, h, score_c0, score_c1)
+    prediction = np.array([
+        [100, 200, 20, 40, 0.1, 0.9],
+        [300, 300, 10, 10, 0.2, 0.1],
+    ], dtype=np.float32).T
+    boxes = postprocess(prediction, conf=0.3, iou=0.45, scale=0.5, pad=(0, 10), shape=(640, 1200))
+    assert boxes.shape == (1, 6)
+    assert boxes[0].tolist() == pytest.approx([180, 340, 220, 420, 0.9, 1])
+
+
+def test_create_engine_rejects_hailo_models():
+    with pytest.raises(ValueError):
+        create_engine("yolo11s-hef")
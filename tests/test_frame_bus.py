@@ -0,0 +1,100 @@
+"""
+Tests for the shared-memory frame bus.
+"""
+
+import os
+import time
+import numpy as np
+import pytest
+from app.services.detection_result import DetectionResult
+from app.services.frame_bus import FrameBus
+
+
+@pytest.fixture
+def bus_name():
+    return f"yolo-test-{os.getpid()}-{time.monotonic_ns()}"
+
+
+@pytest.fixture
+def writer(bus_name):
+    bus = FrameBus.create(bus_name, stream_id=0xabc, slots=2, frame_bytes=48 * 64 * 3, max_detections=4)
+    yield bus
+    bus.close()
+
+
+def _frame(value):
+    return np.full((48, 64, 3), value, dtype=np.uint8)
+
+
+def test_reader_gets_read_only_views_of_latest_frame(writer, bus_name):
+    reader = FrameBus.attach(bus_name)
+    assert reader.read() is None
+    
+    writer.publish(1, _frame(7), DetectionResult.from_array([[1, 2, 3, 4, 0.9, 5]]))
+    seq, frame, result = reader.read()
+    assert seq == 1 and reader.stream_id == 0xabc
+    assert frame.shape == (48, 64, 3) and (frame == 7).all()
+    assert not frame.flags.writeable
+    assert result.class_id.tolist() == [5]
+    
+    # Overwritten once the writer laps the two-slot ring
+    writer.publish(2, _frame(8), None)
+    assert reader.is_valid(1)
+    writer.publish(3, _frame(9), None)
+    assert not reader.is_valid(1)
+    del frame
+    reader.close()
+
+
+def test_reader_gets_track_ids(writer, bus_name):
+    reader = FrameBus.attach(bus_name)
+    tracked = DetectionResult([[1, 2, 3, 4], [5, 6, 7, 8]], [0.9, 0.8], [5, 6], track_id=[2 ** 40, 7])
+    writer.publish(1, _frame(1), tracked)
+    assert reader.read()[2].track_id.tolist() == [2 ** 40, 7]
+    
+    writer.publish(2, _frame(2), DetectionResult.from_array([[1, 2, 3, 4, 0.9, 5]]))
+    assert reader.read()[2].track_id is None
+    reader.close()
+
+
+def test_writer_rejects_oversized_frames(writer):
+    with pytest.raises(ValueError):
+        writer.publish(1, np.zeros((100, 100, 3), dtype=np.uint8), None)
+
+
+def test_shared_capture_service_follows_writer(writer, bus_name):
+    from app.services.detection_service import DetectionService
+    from app.services.logger_service import Logger
+    from app.services.shared_capture_service import SharedCaptureService
+    
+    service = SharedCaptureService(DetectionService(simulation_mode=True), Logger(), bus_name, poll_interval=0.001)
+    service.start_capture()
+    writer.publish(5, _frame(3), DetectionResult.from_array([[1, 2, 3, 4, 0.9, 0]]))
+    
+    assert service.wait_for_frame(0, timeout=2.0) == 5
+    assert service.stream_id == 'abc'
+    assert service.get_latest_detections()[0]['class_name'] == 'TC'
+    seq, data = service.get_encoded_frame("raw")
+    assert seq == 5 and data[:2] == b'\xff\xd8'
+    service.stop_capture()
+
+
+def test_capture_keeps_running_when_frame_does_not_fit_bus(writer):
+    from app.services.capture_service import CaptureService
+    from app.services.detection_service import DetectionService
+    from app.services.logger_service import Logger, LogLevel
+    
+    logger = Logger()
+    service = CaptureService(True, DetectionService(simulation_mode=True), logger, target_fps=0, frame_bus=writer)
+    service.camera.capture = lambda: np.zeros((96, 128, 3), dtype=np.uint8)
+    service.start_capture()
+    try:
+        assert service.wait_for_frame(3, timeout=5) is not None
+    finally:
+        service.stop_capture()
+    
+    # Served locally, not shared, and the error is logged once
+    assert service.get_latest_frame().shape == (96, 128, 3)
+    assert writer.latest_seq() == 0
+    errors = logger.get_logs_by_level(LogLevel.ERROR)
+    assert len(errors) == 1 and "does not fit the bus" in errors[0]['message']
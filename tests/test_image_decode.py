@@ -0,0 +1,43 @@
+"""
+Tests for upload decoding helpers.
+"""
+
+import io
+import cv2
+import numpy as np
+import pytest
+from app.utils.image_decode import decode_image, decode_raw, jpeg_dimensions
+
+
+def _jpeg(width, height):
+    ret, jpeg = cv2.imencode('.jpg', np.full((height, width, 3), 128, dtype=np.uint8))
+    return jpeg.tobytes()
+
+
+def test_jpeg_dimensions_reads_header():
+    assert jpeg_dimensions(np.frombuffer(_jpeg(1920, 1080), np.uint8)) == (1920, 1080)
+    assert jpeg_dimensions(np.frombuffer(b'not a jpeg', np.uint8)) is None
+
+
+def test_decode_image_reduces_only_while_above_min_size():
+    frame, factor = decode_image(_jpeg(2600, 1400), min_size=640)
+    assert factor == pytest.approx(4, rel=0.01)
+    assert frame.shape[1] == 650
+    
+    frame, factor = decode_image(_jpeg(1000, 600), min_size=640)
+    assert factor == 1 and frame.shape[:2] == (600, 1000)
+    
+    assert decode_image(b'garbage', min_size=640) == (None, 1)
+
+
+def test_decode_raw_converts_rgb_and_checks_length():
+    rgb = np.zeros((2, 3, 3), dtype=np.uint8)
+    rgb[..., 0] = 255
+    frame = decode_raw(io.BytesIO(rgb.tobytes()), 3, 2, 3, "rgb")
+    assert frame.shape == (2, 3, 3)
+    assert (frame[..., 2] == 255).all() and (frame[..., 0] == 0).all()
+    
+    with pytest.raises(ValueError):
+        decode_raw(io.BytesIO(b'\x00' * 10), 3, 2)
+    with pytest.raises(ValueError):
+        decode_raw(io.BytesIO(b''), 100000, 100000, max_bytes=1024)
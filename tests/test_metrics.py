@@ -0,0 +1,59 @@
+"""
+Unit tests for the Prometheus-style metrics.
+
+Run with: pytest
+"""
+
+import threading
+import pytest
+from app.services.metrics import MetricsRegistry
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("stage_seconds", "Stage time", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.labels("capture").observe(value)
+    
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP stage_seconds Stage time", "# TYPE stage_seconds histogram"]
+    assert 'stage_seconds_bucket{stage="capture",le="0.1"} 2' in lines
+    assert 'stage_seconds_bucket{stage="capture",le="1"} 3' in lines
+    assert 'stage_seconds_bucket{stage="capture",le="+Inf"} 4' in lines
+    assert 'stage_seconds_sum{stage="capture"} 3.65' in lines
+    assert 'stage_seconds_count{stage="capture"} 4' in lines
+
+
+def test_counter_sums_updates_from_finished_threads():
+    registry = MetricsRegistry()
+    counter = registry.counter("requests_total", "Requests")
+    
+    def work():
+        for _ in range(1000):
+            counter.inc()
+    
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counter.inc(2)
+    
+    assert "requests_total 8002" in registry.render()
+    # Cells of the finished threads were folded into one
+    assert len(counter.labels().cells.cells) == 1
+
+
+def test_gauge_function_and_label_checks():
+    registry = MetricsRegistry()
+    gauge = registry.gauge("queue_depth", "Queued jobs")
+    gauge.set_function(lambda: 3)
+    assert "queue_depth 3" in registry.render()
+    
+    labelled = registry.gauge("fps", "Frames per second", ("source",))
+    labelled.labels('say "hi"').set(2.5)
+    assert 'fps{source="say \\"hi\\""} 2.5' in registry.render()
+    with pytest.raises(ValueError):
+        labelled.labels()
+    with pytest.raises(ValueError):
+        registry.counter("fps", "Duplicate")
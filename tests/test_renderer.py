@@ -0,0 +1,44 @@
+"""
+Unit tests for the annotation renderer.
+
+Run with: pytest
+"""
+
+import numpy as np
+from app.services.detection_result import DetectionResult
+from app.services.renderer import AnnotationRenderer
+
+
+def _result():
+    return DetectionResult.from_array([[100, 100, 200, 260, 0.91, 0], [0, 0, 50, 50, 0.92, 1]])
+
+
+def test_render_draws_without_touching_source_frame():
+    frame = np.zeros((320, 600, 3), dtype=np.uint8)
+    annotated = AnnotationRenderer().render(frame, _result())
+    assert annotated.shape == frame.shape
+    assert annotated.any()
+    assert not frame.any()
+
+
+def test_render_reuses_buffer_and_label_sprites():
+    renderer = AnnotationRenderer()
+    frame = np.zeros((320, 600, 3), dtype=np.uint8)
+    first = renderer.render(frame, _result())
+    second = renderer.render(frame, _result())
+    assert first is second
+    # 0.91 and 0.92 fall in the same 0.05 confidence bucket but are different classes
+    assert len(renderer.sprites) == 2
+
+
+def test_render_keeps_a_bounded_number_of_buffers():
+    renderer = AnnotationRenderer(max_buffers=2)
+    for width in range(100, 140):
+        renderer.render(np.zeros((60, width, 3), dtype=np.uint8), _result())
+    assert len(renderer.local.buffers) == 2
+
+
+def test_render_preview_is_downscaled():
+    frame = np.zeros((320, 600, 3), dtype=np.uint8)
+    preview = AnnotationRenderer().render(frame, _result(), scale=0.5)
+    assert preview.shape == (160, 300, 3)
@@ -0,0 +1,79 @@
+"""
+Tests for the detection result cache.
+"""
+
+import time
+import numpy as np
+from app.services.detection_result import DetectionResult
+from app.services.result_cache import ResultCache, DiskCacheBackend
+
+
+def _result():
+    return DetectionResult.from_array([[10, 20, 110, 220, 0.9, 3]])
+
+
+def test_key_depends_on_content_model_and_conf():
+    key = ResultCache.key(b'image', 'a', 0.3)
+    assert key == ResultCache.key(b'image', 'a', 0.3)
+    assert key != ResultCache.key(b'image', 'b', 0.3)
+    assert key != ResultCache.key(b'image', 'a', 0.5)
+    assert ResultCache.key(np.zeros((2, 3, 3), np.uint8), 'a', 0.3) != ResultCache.key(np.zeros((3, 2, 3), np.uint8), 'a', 0.3)
+
+
+def test_memory_cache_evicts_lru_and_expires():
+    cache = ResultCache(max_entries=2, ttl=60)
+    for key in ('a', 'b'):
+        cache.put(key, _result())
+    cache.get('a')
+    cache.put('c', _result())
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+    
+    cache.ttl = 0.01
+    cache.put('d', _result())
+    time.sleep(0.02)
+    assert cache.get('d') is None
+    
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (2, 2, 2)
+
+
+def test_disk_backend_shares_entries(tmp_path):
+    writer = ResultCache(ttl=60, backend=DiskCacheBackend(str(tmp_path)))
+    reader = ResultCache(ttl=60, backend=DiskCacheBackend(str(tmp_path)))
+    writer.put('k', _result())
+    result = reader.get('k')
+    assert result.class_id.tolist() == [3]
+    assert result.xyxy.tolist() == [[10, 20, 110, 220]]
+
+
+def test_disk_backend_survives_concurrent_prune_and_clear(tmp_path, monkeypatch):
+    import os
+    
+    backend = DiskCacheBackend(str(tmp_path), max_entries=1)
+    cache = ResultCache(ttl=60, backend=backend)
+    cache.put('a', _result())
+    
+    # Another worker removes 'a' between listdir and getmtime
+    getmtime = os.path.getmtime
+    
+    def racing_getmtime(filename):
+        if filename.endswith('a'):
+            os.remove(filename)
+        return getmtime(filename)
+    
+    monkeypatch.setattr(os.path, 'getmtime', racing_getmtime)
+    cache.put('b', _result())
+    monkeypatch.undo()
+    assert cache.get('b') is not None
+    
+    # An in-flight write of another worker is left alone by clear
+    (tmp_path / 'c.1.2.tmp').write_bytes(b'')
+    cache.clear()
+    assert os.listdir(tmp_path) == ['c.1.2.tmp']
+    
+    # A write that fails outright only costs the entry
+    os.remove(tmp_path / 'c.1.2.tmp')
+    os.rmdir(tmp_path)
+    cache.put('d', _result())
+    assert cache.get('d') is None
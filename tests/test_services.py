@@ -0,0 +1,422 @@
+"""
+Unit tests for the capture and detection services.
+
+Run with: pytest
+"""
+
+import numpy as np
+import pytest
+from app.services.capture_service import CaptureService
+from app.services.detection_service import DetectionService
+from app.services.logger_service import Logger, LogLevel
+
+
+@pytest.fixture
+def detection_service(fake_model):
+    """A live-mode detection service backed by a fake model."""
+    service = DetectionService(simulation_mode=True, model_name="yolo11n-pt")
+    service.simulation_mode = False
+    service.model = fake_model
+    return service
+
+
+@pytest.fixture
+def frame():
+    return np.zeros((64, 96, 3), dtype=np.uint8)
+
+
+def test_detect_with_results_parses_model_output(detection_service, frame):
+    detections, results = detection_service.detect_with_results(frame)
+    assert detections == [{"class_name": "TC", "confidence": pytest.approx(0.9), "box": [10, 20, 110, 220]}]
+    assert results is not None
+    assert detection_service.model.calls == 1
+
+
+def test_annotate_frame_reuses_precomputed_results(detection_service, frame):
+    _, results = detection_service.detect_with_results(frame)
+    annotated = detection_service.annotate_frame(frame, results=results)
+    assert annotated.shape == frame.shape
+    assert detection_service.model.calls == 1
+
+
+def test_capture_publish_caches_results_with_sequence(detection_service, frame):
+    capture_service = CaptureService(True, detection_service, Logger())
+    detections, results = detection_service.detect_with_results(frame)
+    capture_service._publish(frame, detections, results)
+    seq, latest_frame, latest_results = capture_service.get_latest_result()
+    assert seq == 1
+    assert latest_frame.base is frame
+    assert latest_results is results
+    assert capture_service.get_latest_detections() == detections
+
+
+def test_encoded_frame_is_shared_until_next_frame(detection_service, frame):
+    capture_service = CaptureService(True, detection_service, Logger())
+    assert capture_service.get_encoded_frame("raw") is None
+    
+    capture_service._publish(frame, [], None)
+    seq, first = capture_service.get_encoded_frame("raw")
+    _, second = capture_service.get_encoded_frame("raw")
+    assert first is second
+    
+    capture_service._publish(frame, [], None)
+    next_seq, third = capture_service.get_encoded_frame("raw")
+    assert next_seq == seq + 1
+    assert third is not first
+
+
+def test_wait_for_frame_skips_to_newest(detection_service, frame):
+    capture_service = CaptureService(True, detection_service, Logger())
+    assert capture_service.wait_for_frame(0, timeout=0.01) is None
+    
+    capture_service._publish(frame, [], None)
+    capture_service._publish(frame, [], None)
+    assert capture_service.wait_for_frame(0, timeout=0.01) == 2
+
+
+def test_logger_returns_entries_since_cursor():
+    logger = Logger()
+    logger.log(LogLevel.INFO, "first")
+    logger.log(LogLevel.ERROR, "second")
+    logger.log(LogLevel.INFO, "third")
+    
+    latest_seq, clear_seq, entries = logger.get_logs_since(1)
+    assert latest_seq == 3
+    assert clear_seq == 0
+    assert [entry['message'] for entry in entries] == ["second", "third"]
+    assert logger.wait_for_logs(3, timeout=0.01) is None
+
+
+def test_logger_clear_advances_sequence():
+    logger = Logger()
+    logger.log(LogLevel.INFO, "first")
+    logger.clear_logs()
+    
+    assert logger.wait_for_logs(1, timeout=0.01) == 2
+    latest_seq, clear_seq, entries = logger.get_logs_since(1)
+    assert (latest_seq, clear_seq, entries) == (2, 2, [])
+
+
+def test_logger_ring_keeps_newest_entries():
+    logger = Logger()
+    logger.max_buffer_size = 3
+    logger.clear_logs()
+    for i in range(5):
+        logger.log(LogLevel.INFO, f"entry {i}")
+    
+    messages = [entry['message'] for entry in logger.get_logs_by_level(LogLevel.INFO)]
+    assert messages == ["entry 2", "entry 3", "entry 4"]
+
+
+def test_logger_since_pages_with_limit():
+    logger = Logger()
+    for i in range(5):
+        logger.log(LogLevel.INFO if i % 2 else LogLevel.DETECTION, f"entry {i}")
+    
+    _, _, page = logger.get_logs_since(0, limit=2)
+    assert [entry['message'] for entry in page] == ["entry 0", "entry 1"]
+    _, _, page = logger.get_logs_since(page[-1]['seq'], limit=2)
+    assert [entry['message'] for entry in page] == ["entry 2", "entry 3"]
+
+
+def test_log_feed_sends_entries_logged_mid_read_only_once():
+    from app.utils.streams import LogFeed
+    
+    logger = Logger()
+    logger.log(LogLevel.INFO, "first")
+    logger.log(LogLevel.INFO, "second")
+    # As if "second" was logged between taking latest_seq and reading the rings
+    logger.log_seq = 1
+    feed = LogFeed(logger, cursor=0)
+    assert [event.count('"message"') for event in feed.next_events()] == [1]
+    logger.log_seq = 2
+    events = feed.next_events()
+    assert len(events) == 1 and '"second"' in events[0]
+
+
+def test_log_ring_read_drops_slot_being_overwritten():
+    from app.services.logger_service import LogRing
+    
+    class RacingSlots(list):
+        # The writer runs once, right as the reader looks at its first slot
+        writer = None
+        
+        def __getitem__(self, index):
+            writer, self.writer = self.writer, None
+            if writer is not None:
+                writer()
+            return super().__getitem__(index)
+    
+    ring = LogRing(4)
+    for seq in range(1, 6):
+        ring.append((seq,))
+    ring.slots = RacingSlots(ring.slots)
+    
+    def writer():
+        ring.append((6,))
+        # Seq 7 is stored over seq 2 but not yet counted
+        list.__setitem__(ring.slots, ring.written % ring.size, (7,))
+    
+    ring.slots.writer = writer
+    assert [entry[0] for entry in ring.read()] == [3, 4, 5]
+
+
+def test_scheduler_batches_concurrent_requests():
+    import threading
+    from app.services.inference_scheduler import InferenceScheduler
+    
+    calls = []
+    release = threading.Event()
+    
+    def run_batch(frames, conf):
+        calls.append(list(frames))
+        release.wait(1)
+        return [frame * 10 for frame in frames]
+    
+    scheduler = InferenceScheduler(run_batch, max_batch_size=8, max_wait_ms=50)
+    first = scheduler.submit([1])
+    futures = [scheduler.submit([n]) for n in (2, 3, 4)]
+    release.set()
+    
+    assert first.result(1) == [10]
+    assert [future.result(1) for future in futures] == [[20], [30], [40]]
+    assert sorted(len(batch) for batch in calls) in ([4], [1, 3])
+
+
+def test_scheduler_rejects_when_queue_full():
+    import threading
+    from app.services.inference_scheduler import InferenceScheduler, QueueFullError
+    
+    release = threading.Event()
+    scheduler = InferenceScheduler(lambda frames, conf: release.wait(1) and frames, max_batch_size=1, queue_depth=1)
+    running = scheduler.submit([1])
+    while scheduler.queue_depth():
+        pass
+    scheduler.submit([2])
+    with pytest.raises(QueueFullError):
+        scheduler.submit([3])
+    release.set()
+    assert running.result(1) == [1]
+
+
+def test_latest_frame_slot_drops_stale_items():
+    from app.services.capture_service import LatestFrameSlot
+    
+    slot = LatestFrameSlot()
+    slot.put("old")
+    slot.put("new")
+    assert slot.get(timeout=0.01) == "new"
+    assert slot.get(timeout=0.01) is None
+    assert slot.dropped == 1
+
+
+def test_capture_pipeline_publishes_and_reports_stage_timings(detection_service):
+    capture_service = CaptureService(True, detection_service, Logger(), target_fps=0)
+    capture_service.start_capture()
+    try:
+        assert capture_service.wait_for_frame(2, timeout=5) is not None
+    finally:
+        capture_service.stop_capture()
+    
+    stats = capture_service.get_stats()
+    assert stats["frame_seq"] >= 3
+    assert set(stats["stages_ms"]) == {"capture", "preprocess", "inference", "publish"}
+
+
+def test_capture_loop_survives_camera_errors(detection_service, frame):
+    logger = Logger()
+    capture_service = CaptureService(True, detection_service, logger, target_fps=0)
+    failures = [RuntimeError("camera unplugged")] * 2
+    
+    def capture():
+        if failures:
+            raise failures.pop()
+        return frame.copy()
+    
+    capture_service.camera.capture = capture
+    capture_service.start_capture()
+    try:
+        assert capture_service.wait_for_frame(0, timeout=5) is not None
+    finally:
+        capture_service.stop_capture()
+    
+    errors = logger.get_logs_by_level(LogLevel.ERROR)
+    assert len(errors) == 1 and "camera unplugged" in errors[0]['message']
+
+
+def test_model_registry_swaps_and_evicts_least_recently_used():
+    from app.services.model_registry import ModelRegistry
+    
+    active = {}
+    registry = ModelRegistry(lambda name: f"model:{name}", max_resident=2,
+                             on_activate=lambda name, model: active.update(name=name, model=model))
+    
+    assert registry.activate("a").result(1) == "model:a"
+    assert active == {"name": "a", "model": "model:a"}
+    registry.preload("b").result(1)
+    registry.activate("c").result(1)
+    
+    status = registry.status()
+    assert status["active_model"] == "c"
+    # "a" was still active while "c" loaded, so the idle "b" was evicted
+    assert status["resident_models"] == ["a", "c"]
+    assert active["name"] == "c"
+
+
+def test_model_registry_keeps_old_model_when_load_fails():
+    from app.services.model_registry import ModelRegistry
+    
+    def loader(name):
+        if name == "broken":
+            raise RuntimeError("bad weights")
+        return name
+    
+    active = {}
+    registry = ModelRegistry(loader, on_activate=lambda name, model: active.update(name=name))
+    registry.activate("good").result(1)
+    with pytest.raises(RuntimeError):
+        registry.activate("broken").result(1)
+    assert active["name"] == "good"
+    assert "bad weights" in registry.status()["last_error"]
+    registry.activate("good").result(1)
+    assert registry.status()["last_error"] is None
+
+
+def test_encoded_frame_variants_are_bounded(detection_service, frame):
+    capture_service = CaptureService(True, detection_service, Logger(), max_variants=2)
+    capture_service._publish(frame, [], None)
+    
+    _, small = capture_service.get_encoded_frame("raw", width=48)
+    capture_service.get_encoded_frame("raw", width=24)
+    capture_service.get_encoded_frame("raw", fmt="png")
+    assert len(capture_service.encoded_frames) == 2
+    _, again = capture_service.get_encoded_frame("raw", width=48)
+    assert again is not small
+
+
+def test_frame_pool_reuses_only_unreferenced_buffers():
+    from app.services.frame_pool import FramePool, read_only
+    
+    pool = FramePool(size=2)
+    first = pool.acquire((4, 4, 3))
+    held = read_only(first)[1:3]
+    del first
+    # A reader still holds a slice of the first buffer
+    second = pool.acquire((4, 4, 3))
+    assert not np.shares_memory(held, second)
+    del second
+    assert pool.stats()['free'] == 1
+    del held
+    assert pool.stats()['free'] == 2
+    assert pool.acquire((4, 4, 3)).base is pool.buffers[0]
+    assert pool.stats()['allocations'] == 2
+
+
+def test_frame_pool_allocates_outside_the_pool_when_all_leased():
+    from app.services.frame_pool import FramePool
+    
+    pool = FramePool(size=1)
+    leased = pool.acquire((2, 2))
+    extra = pool.acquire((2, 2))
+    assert extra.base is None and len(pool.buffers) == 1
+    del leased
+    assert pool.acquire((4, 4)).base is pool.buffers[0]
+
+
+def test_latest_frame_is_shared_read_only(detection_service, frame):
+    from app.services.capture_service import CaptureService
+    from app.services.logger_service import Logger
+    
+    service = CaptureService(True, detection_service, Logger())
+    service._publish(frame, [], None)
+    latest = service.get_latest_frame()
+    assert latest is service.get_latest_frame()
+    assert not latest.flags.writeable
+    assert np.shares_memory(latest, frame)
+
+
+def test_change_gate_skips_static_frames_until_refresh(frame):
+    from app.services.change_gate import ChangeGate
+    
+    gate = ChangeGate(threshold=3.0, refresh_seconds=60)
+    assert gate.changed(frame)
+    assert not gate.changed(frame.copy())
+    assert not gate.changed(frame + 2)
+    assert gate.changed(frame + 50)
+    assert gate.stats()["skipped"] == 2
+    
+    gate.refresh_seconds = 0
+    assert gate.changed(frame + 50)
+
+
+def test_capture_reuses_detections_when_gate_closed(detection_service, frame):
+    from app.services.change_gate import ChangeGate
+    
+    from app.services import metrics
+    
+    service = CaptureService(True, detection_service, Logger(), source_id="gated",
+                             change_gate=ChangeGate(refresh_seconds=60))
+    first = service._detect(frame)
+    assert service._detect(frame.copy()) is first
+    service._detect(frame + 100)
+    assert detection_service.model.calls == 2
+    assert service.get_stats()["change_gate"]["skip_rate"] == pytest.approx(1 / 3, abs=1e-3)
+    
+    rendered = metrics.REGISTRY.render()
+    assert 'yolo_capture_inference_skipped_total{source="gated"} 1' in rendered
+    assert 'yolo_capture_inferences_total{source="gated"} 2' in rendered
+
+
+def test_tile_windows_cover_frame_with_overlap():
+    from app.services.detection_service import tile_windows
+    
+    assert tile_windows(1200, 640, 640) == [(0, 0, 640, 640), (280, 0, 920, 640), (560, 0, 1200, 640)]
+    assert tile_windows(320, 200, 640) == [(0, 0, 320, 200)]
+
+
+def test_tiled_detection_batches_tiles_and_merges_duplicates(detection_service):
+    frame = np.zeros((640, 1200, 3), dtype=np.uint8)
+    result = detection_service.detect_tiled_results(frame, tile_size=640, overlap=0.2)
+    # Three tiles and the full frame in one forward pass
+    assert detection_service.model.batch_sizes == [4]
+    # The box found at (10, 20) in each tile lands at distinct frame positions;
+    # the full-frame copy of the first tile's box is suppressed
+    assert sorted(result.xyxy[:, 0].tolist()) == [10, 290, 570]
+
+
+def test_capture_roi_reports_boxes_in_frame_pixels(detection_service):
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    service = CaptureService(True, detection_service, Logger(), roi=[100, 50, 500, 450])
+    detections, _ = service._detect(frame)
+    assert detections[0]["box"] == [110, 70, 210, 270]
+    
+    with pytest.raises(ValueError):
+        CaptureService(True, detection_service, Logger(), roi=[100, 50, 50, 450])
+
+
+def test_camera_opens_in_background_and_falls_back_to_fake_frames():
+    from app.utils.camera import Camera
+    
+    camera = Camera(simulation_mode=False)
+    # picamera2 is not installed here, so the background open falls back to simulation
+    frame = camera.capture()
+    assert camera.is_ready() and camera.simulation_mode
+    assert frame.ndim == 3
+
+
+def test_detection_feed_sends_only_changed_sets():
+    from app.utils.streams import DetectionFeed
+    
+    class Source:
+        latest = (1, [{"class_name": "TC"}])
+        
+        def get_latest_detection_set(self):
+            return self.latest
+    
+    source = Source()
+    feed = DetectionFeed(source, cursor=0)
+    assert "id: 1" in feed.next_event()
+    source.latest = (2, [{"class_name": "TC"}])
+    assert feed.next_event() is None and feed.cursor == 2
+    source.latest = (3, [])
+    assert "id: 3" in feed.next_event()
@@ -0,0 +1,68 @@
+"""
+Tests for the IoU tracker.
+"""
+
+import numpy as np
+import pytest
+from app.services.detection_result import DetectionResult
+from app.services.tracker import IouTracker, iou_matrix
+
+
+def _result(rows):
+    return DetectionResult.from_array(rows)
+
+
+def test_iou_matrix():
+    a = np.array([[0, 0, 10, 10]], dtype=np.float32)
+    b = np.array([[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]], dtype=np.float32)
+    assert iou_matrix(a, b)[0].tolist() == pytest.approx([1.0, 1 / 3, 0.0])
+
+
+def test_tracks_keep_ids_and_smooth_confidence():
+    tracker = IouTracker(iou_threshold=0.3, max_missed=1, smoothing=0.5)
+    tracked, events = tracker.update(_result([[0, 0, 100, 100, 0.8, 1], [200, 0, 300, 100, 0.9, 2]]))
+    assert tracked.track_id.tolist() == [1, 2]
+    assert [event[0] for event in events] == ["enter", "enter"]
+    
+    # Moved a little, and a new card of another class appears on top of track 1
+    tracked, events = tracker.update(_result([[10, 0, 110, 100, 0.6, 1], [0, 0, 100, 100, 0.9, 3]]))
+    records = {record["track_id"]: record for record in tracked.to_records()}
+    assert records[1]["box"] == [10, 0, 110, 100]
+    assert records[1]["confidence"] == pytest.approx(0.7)
+    assert events == [("enter", 3, "TS")]
+    
+    # Track 2 was already missed once, so it leaves a frame earlier
+    _, events = tracker.update(_result([]))
+    assert events == [("leave", 2, "TH")]
+    _, events = tracker.update(_result([]))
+    assert sorted(event[1] for event in events if event[0] == "leave") == [1, 3]
+    assert len(tracker) == 0
+
+
+def test_propagate_moves_tracks_by_velocity():
+    tracker = IouTracker()
+    tracker.update(_result([[0, 0, 100, 100, 0.9, 0]]))
+    tracker.update(_result([[10, 0, 110, 100, 0.9, 0]]))
+    assert tracker.propagate().xyxy.tolist() == [[20, 0, 120, 100]]
+    # Two frames later the detection is matched against the propagated box
+    tracked, events = tracker.update(_result([[30, 0, 130, 100, 0.9, 0]]))
+    assert tracked.track_id.tolist() == [1] and events == []
+
+
+def test_capture_service_skips_inference_between_tracked_frames(fake_model):
+    from app.services.capture_service import CaptureService
+    from app.services.detection_service import DetectionService
+    from app.services.logger_service import Logger, LogLevel
+    
+    detection_service = DetectionService(simulation_mode=True)
+    detection_service.simulation_mode = False
+    detection_service.model = fake_model
+    logger = Logger()
+    service = CaptureService(True, detection_service, logger, tracker=IouTracker(), inference_interval=3)
+    
+    frame = np.zeros((64, 96, 3), dtype=np.uint8)
+    for _ in range(6):
+        detections, _ = service._detect(frame)
+        assert detections[0]["track_id"] == 1
+    assert fake_model.calls == 2
+    assert [entry["message"] for entry in logger.get_logs_by_level(LogLevel.DETECTION)] == ["TC entered (track 1)"]